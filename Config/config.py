@@ -51,6 +51,7 @@ class AppConfig:
     REFERENCE_LBP = "Data/Reference/stream_images/lbp"
     REFERENCE_RGB = "Data/Reference/stream_images/rgb"
     REFERENCE_TEXTURE = "Data/Reference/stream_images/texture"
+    STREAM_IMAGES_TRASH = "Data/Trash/stream_images"
     STREAM_BG_CHANGED = "Data/Background_changed"
     K_FOLD = "Data/KFold"
     DATA_LIST_JSON = "Data/JSON/PTE_PE_pills.json"
@@ -69,6 +70,11 @@ class AppConfig:
     GEOMETRY_COORDS = "Data/Geometry_Coords"
     DATASET = "Data/Dataset"
     SEGMENTATION_WEIGHTS = "/app/weights/best.pt"
+    SEGMENTATION_ENGINE = "/app/weights/best.engine"
+    SEGMENTATION_BATCH_SIZE = 16
     VERIF_MASKS = "Data/Verif_Masks"
     VERIF_PILLS = "Data/Verif_Pills"
     VERIF_BACKGROUNDS = "Data/Verif_Backgrounds"
+    SAVE_VERIFICATION_ARTIFACTS = False
+    STREAM_JPEG_QUALITY = 85
+    LBP_METHOD = "default"
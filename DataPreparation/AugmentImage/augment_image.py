@@ -1,4 +1,3 @@
-import base64
 import cv2
 import gc
 import glob
@@ -17,6 +16,9 @@ from Config.config import AppConfig
 from Logger.logger import logger
 
 
+CACHE_BATCH_SIZE = 256
+
+
 class AugmentImage:
     def __init__(self, stop_event=None):
         """
@@ -47,6 +49,7 @@ class AugmentImage:
         self._current_progress = 0
         self._total_files = 0
         self._processed_files = 0
+        self._created_dirs = set()
         self.stop = False
 
         self.redis = redis.Redis(
@@ -56,33 +59,33 @@ class AugmentImage:
             socket_connect_timeout=3,
             decode_responses=False
         )
-        self.redis_cache_prefix = "img_aug:"
+        self.redis_cache_prefix = "img_aug:v2:"
 
     def _serialize_image(self, image):
         """
-        Serialize an image to a base64 string for caching.
+        Serialize an image to PNG bytes for caching. The Redis client does not decode responses,
+        so the bytes are stored as they are.
 
         Args:
             image (np.ndarray): The image to serialize.
 
         Returns:
-            str: Base64 encoded string of the image.
+            bytes: The PNG-encoded image.
         """
         _, buffer = cv2.imencode('.png', image)
-        return base64.b64encode(buffer).decode('utf-8')
+        return buffer.tobytes()
 
-    def _deserialize_image(self, image_str):
+    def _deserialize_image(self, image_bytes):
         """
-        Deserialize a base64 string back to an image.
+        Deserialize PNG bytes back to an image.
 
         Args:
-            image_str (str): Base64 encoded string of the image.
+            image_bytes (bytes): The PNG-encoded image.
 
         Returns:
             np.ndarray: The deserialized image.
         """
-        buffer = base64.b64decode(image_str.encode('utf-8'))
-        return cv2.imdecode(np.frombuffer(buffer, np.uint8), -1)
+        return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), -1)
 
     def cache_image_triplet(self, img_file, mask_file, ann_file, is_train=True):
         """
@@ -138,8 +141,8 @@ class AugmentImage:
             data = self.redis.hgetall(cache_key)
 
             return {
-                'image': self._deserialize_image(data[b'image'].decode()),
-                'mask': self._deserialize_image(data[b'mask'].decode()),
+                'image': self._deserialize_image(data[b'image']),
+                'mask': self._deserialize_image(data[b'mask']),
                 'annotation': data[b'annotation'].decode(),
                 'is_train': data[b'is_train'].decode().lower() == 'true'
             }
@@ -166,34 +169,6 @@ class AugmentImage:
             "train_mask_images": os.path.exists(AppConfig.SPLIT_TRAIN_MASKS) and bool(os.listdir(AppConfig.SPLIT_TRAIN_MASKS))
         }
 
-    def clear_output_directories(self):
-        """
-        Clear the contents of the output directories for augmented images and masks.
-
-        Args:
-            None
-
-        Returns:
-            None
-        """
-        for path in [
-            self.aug_train_img_path, self.aug_train_mask_path, self.aug_train_annotation_path,
-            self.aug_val_img_path, self.aug_val_mask_path, self.aug_val_annotation_path
-        ]:
-            if os.path.exists(path):
-                for file in os.listdir(path):
-                    file_path = os.path.join(path, file)
-                    try:
-                        os.remove(file_path)
-                    except Exception as e:
-                        logger.error(f"Failed to delete {file_path}: {e}")
-                        raise HTTPException(
-                            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                            detail=f"Failed to delete {file_path}: {e}"
-                        )
-            else:
-                os.makedirs(path, exist_ok=True)
-
     def save_data(self, image, mask, method, txt_op="copy", txt_file=None, base_name=None, is_train=True, annotation=None):
         """
         Save the augmented image, mask, and annotation to the appropriate directories.
@@ -231,9 +206,11 @@ class AugmentImage:
             ann_out_path = os.path.join(
                 self.aug_val_annotation_path, f"{base_name}.txt")
 
-        os.makedirs(os.path.dirname(img_out_path), exist_ok=True)
-        os.makedirs(os.path.dirname(mask_out_path), exist_ok=True)
-        os.makedirs(os.path.dirname(ann_out_path), exist_ok=True)
+        for out_dir in (os.path.dirname(img_out_path), os.path.dirname(mask_out_path),
+                        os.path.dirname(ann_out_path)):
+            if out_dir not in self._created_dirs:
+                os.makedirs(out_dir, exist_ok=True)
+                self._created_dirs.add(out_dir)
 
         cv2.imwrite(img_out_path, image)
         cv2.imwrite(mask_out_path, mask)
@@ -266,9 +243,15 @@ class AugmentImage:
         Returns:
             None
         """
-        cache_keys = self.redis.keys(f"{self.redis_cache_prefix}*")
-        if cache_keys:
-            self.redis.delete(*cache_keys)
+        keys = []
+        for key in self.redis.scan_iter(match=f"{self.redis_cache_prefix}*", count=CACHE_BATCH_SIZE):
+            keys.append(key)
+            if len(keys) >= CACHE_BATCH_SIZE:
+                self.redis.unlink(*keys)
+                keys = []
+
+        if keys:
+            self.redis.unlink(*keys)
 
     def _get_file_count(self, path: str) -> int:
         """
@@ -372,7 +355,8 @@ class AugmentImage:
 
     def apply_white_balance(self, image):
         """
-        Apply white balance to the image using a simple scaling method.
+        Apply white balance to the image using a simple scaling method. Only the color channels are
+        scaled; the alpha channel of a BGRA image is kept, and a grayscale image is scaled as a whole.
 
         Args:
             image (np.ndarray): The input image.
@@ -380,8 +364,12 @@ class AugmentImage:
         Returns:
             np.ndarray: The white-balanced image.
         """
-        scale_factors = np.random.uniform(0.7, 1.2, size=(3,))
-        return (image * scale_factors).clip(0, 255).astype(np.uint8)
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        scale_factors = np.ones(channels)
+        scale_factors[:3] = np.random.uniform(0.7, 1.2, size=(min(channels, 3),))
+        if channels == 1:
+            return cv2.convertScaleAbs(image, alpha=scale_factors[0]).reshape(image.shape)
+        return cv2.transform(image, np.diag(scale_factors))
 
     def apply_blur(self, image):
         """
@@ -407,7 +395,7 @@ class AugmentImage:
             np.ndarray: The brightness-adjusted image.
         """
         factor = random.uniform(0.6, 1.4)
-        return np.clip(image.astype(np.float32) * factor, 0, 255).astype(np.uint8)
+        return cv2.convertScaleAbs(image, alpha=factor)
 
     def apply_rotation(self, image, mask):
         """
@@ -706,6 +694,7 @@ class AugmentImage:
     def clear_output_directories(self):
         """
         Clears all files and subdirectories from the specified output directories used for augmented images, masks, and annotations.
+        Each directory is removed as a whole and recreated instead of deleting its entries one by one.
 
         Args:
             None
@@ -717,16 +706,10 @@ class AugmentImage:
             self.aug_train_img_path, self.aug_train_mask_path, self.aug_train_annotation_path,
             self.aug_val_img_path, self.aug_val_mask_path, self.aug_val_annotation_path
         ]:
-            if os.path.exists(path):
-                for file in os.listdir(path):
-                    file_path = os.path.join(path, file)
-                    try:
-                        if os.path.isfile(file_path):
-                            os.unlink(file_path)
-                        elif os.path.isdir(file_path):
-                            shutil.rmtree(file_path)
-                    except Exception as e:
-                        logger.error(f"Failed to delete {file_path}: {e}")
-                        continue
-            else:
-                os.makedirs(path, exist_ok=True)
+            try:
+                shutil.rmtree(path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Failed to delete {path}: {e}")
+            os.makedirs(path, exist_ok=True)
@@ -60,7 +60,8 @@ class CreateMask:
     @staticmethod
     def save_masks(mask: np.ndarray, img_file: str, path_to_files: Dict[str, str]) -> None:
         """
-        This function saves the mask to a given path.
+        This function saves the mask to a given path. The mask is encoded in memory
+        and written with a single call, bypassing the stdio layer of cv2.imwrite.
 
         Args:
             mask: Mask image.
@@ -73,4 +74,13 @@ class CreateMask:
 
         name = os.path.basename(img_file)
         save_path = os.path.join(path_to_files, name)
-        cv2.imwrite(save_path, mask)
+
+        success, buffer = cv2.imencode(os.path.splitext(name)[1], mask)
+        if not success:
+            logger.error(f"Failed to encode mask for {name}")
+            return
+
+        try:
+            buffer.tofile(save_path)
+        except OSError as e:
+            logger.error(f"Failed to write mask {save_path}: {str(e)}")
@@ -10,6 +10,10 @@ from Config.config import AppConfig
 from Logger.logger import logger
 
 
+ANNOTATION_FILENAME_PATTERN = re.compile(
+    r'^(?:[0-3]\d{3})_([a-z0-9_-]+)_(?:u|s)_(?:t|b)\.txt$')
+
+
 class RemapAnnotation:
     def __init__(self):
         """
@@ -107,8 +111,7 @@ class RemapAnnotation:
         """
         filename = os.path.basename(file_path)
         class_name = os.path.basename(filename)
-        match = re.match(
-            r'^(?:[0-3]\d{3})_([a-z0-9_-]+)_(?:u|s)_(?:t|b)\.txt$', filename.lower())
+        match = ANNOTATION_FILENAME_PATTERN.match(filename.lower())
 
         if not match:
             logger.error(
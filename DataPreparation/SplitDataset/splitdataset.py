@@ -1,10 +1,12 @@
+import concurrent.futures
 import cv2
 import numpy as np
 import os
 import random
 import redis
-import pickle
 import shutil
+import struct
+import zstandard
 
 
 from fastapi import HTTPException, status
@@ -19,6 +21,12 @@ from DataPreparation.CreateMask.createmask import CreateMask
 from Logger.logger import logger
 
 
+MASK_HEADER = struct.Struct("<4sB3I")
+MASK_SAMPLE_SIZE = 16
+CACHE_BATCH_SIZE = 256
+MASK_COMPRESSION_LEVEL = 1
+
+
 class SplitDataset:
     def __init__(self):
         """
@@ -37,11 +45,29 @@ class SplitDataset:
             host='redis',
             port=AppConfig.REDIS_PORT,
             db=2,
-            decode_responses=False
+            decode_responses=False,
+            socket_keepalive=True,
+            health_check_interval=30
         )
-        self.mask_cache_prefix = "mask_gen:"
+        self.mask_cache_prefix = "mask_gen:v3:"
         self.createmask = CreateMask()
 
+    def list_files(self, path: str) -> List[str]:
+        """
+        List the files of a directory with a single scandir pass.
+
+        Args:
+            path (str): The directory to list.
+
+        Returns:
+            List[str]: The sorted filenames in the directory, or an empty list if it does not exist.
+        """
+        try:
+            with os.scandir(path) as entries:
+                return sorted(entry.name for entry in entries if entry.is_file())
+        except FileNotFoundError:
+            return []
+
     async def get_progress(self):
         """
         Get the current progress of the dataset splitting process.
@@ -73,15 +99,22 @@ class SplitDataset:
         Returns:
             None
         """
-        keys = self.redis.keys(f"{self.mask_cache_prefix}*")
+        # Batched SCAN + UNLINK, so clearing a large cache never stalls the Redis server.
+        keys = []
+        for key in self.redis.scan_iter(match=f"{self.mask_cache_prefix}*", count=CACHE_BATCH_SIZE):
+            keys.append(key)
+            if len(keys) >= CACHE_BATCH_SIZE:
+                self.redis.unlink(*keys)
+                keys = []
+
         if keys:
-            self.redis.delete(*keys)
+            self.redis.unlink(*keys)
         logger.info("Cleared mask cache")
 
     async def get_data_availability(self):
         """
         Check the availability of original images, segmentation labels, and mask images.
-        If masks are missing or invalid, generate them from labels.
+        If masks are missing or invalid, generate them from labels. Only a random sample of the masks is validated.
 
         Args:
             None
@@ -92,7 +125,7 @@ class SplitDataset:
         logger.info("Checking data availability...")
 
         def get_file_count(path):
-            return len([f for f in os.listdir(path) if os.path.isfile(os.path.join(path, f))]) if os.path.exists(path) else 0
+            return len(self.list_files(path))
 
         def is_valid_mask(mask_path):
             try:
@@ -105,7 +138,7 @@ class SplitDataset:
                 mask = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
                 if mask is None:
                     return False
-                return set(np.unique(mask)).issubset({0, 255})
+                return cv2.countNonZero(cv2.inRange(mask, 1, 254)) == 0
             except Exception as e:
                 logger.error(f"Error validating mask {mask_path}: {str(e)}")
                 return False
@@ -120,10 +153,12 @@ class SplitDataset:
 
         valid_mask_count = 0
         if mask_count > 0:
-            for mask_file in os.listdir(AppConfig.ORIGINAL_MASKS):
-                mask_path = os.path.join(AppConfig.ORIGINAL_MASKS, mask_file)
-                if is_valid_mask(mask_path):
-                    valid_mask_count += 1
+            mask_files = self.list_files(AppConfig.ORIGINAL_MASKS)
+            sampled_masks = random.sample(
+                mask_files, min(MASK_SAMPLE_SIZE, len(mask_files)))
+            if all(is_valid_mask(os.path.join(AppConfig.ORIGINAL_MASKS, mask_file))
+                   for mask_file in sampled_masks):
+                valid_mask_count = mask_count
 
         if (mask_count == 0 or valid_mask_count != img_count or
                 valid_mask_count != label_count) and img_count > 0 and label_count > 0:
@@ -139,24 +174,11 @@ class SplitDataset:
             "mask_images": valid_mask_count > 0 and counts_equal
         }
 
-    def clear_mask_cache(self):
-        """ 
-        Clear the mask cache in Redis.
-
-        Args:
-            None
-
-        Returns:
-            None
-        """
-        keys = self.redis.keys(f"{self.mask_cache_prefix}*")
-        if keys:
-            self.redis.delete(*keys)
-        logger.info("Cleared mask cache")
-
     def serialize_mask(self, mask: np.ndarray) -> bytes:
         """
-        Serialize a mask array to bytes for storage in Redis.
+        Serialize a mask array to its zstd-compressed bytes prefixed with a small dtype and shape header for
+        storage in Redis. Masks are mostly large uniform areas, so even the fastest zstd level shrinks them
+        by orders of magnitude.
 
         Args:
             mask (np.ndarray): The mask array to serialize.
@@ -164,23 +186,16 @@ class SplitDataset:
         Returns:
             bytes: The serialized mask.
         """
-        return pickle.dumps(mask)
-
-    def deserialize_mask(self, mask_bytes: bytes) -> np.ndarray:
-        """
-        Deserialize a mask from bytes back to a numpy array.
-
-        Args:
-            mask_bytes (bytes): The serialized mask bytes.
-
-        Returns:
-            np.ndarray: The deserialized mask array.
-        """
-        return pickle.loads(mask_bytes)
+        mask = np.ascontiguousarray(mask)
+        shape = mask.shape + (1,) * (3 - mask.ndim)
+        header = MASK_HEADER.pack(mask.dtype.str.encode(), mask.ndim, *shape)
+        return header + zstandard.compress(mask.data, MASK_COMPRESSION_LEVEL)
 
     async def generate_masks_from_labels(self, interp_points: int = 100):
         """
-        Generate masks from segmentation labels using CreateMask class and cache them in Redis.
+        Generate masks from segmentation labels using CreateMask class and cache them in Redis. Every mask
+        is generated from its label: get_data_availability clears the mask cache right before calling this,
+        so the cache is never read here.
 
         Args:
             interp_points (int): Number of interpolation points for smoothing the mask.
@@ -190,36 +205,23 @@ class SplitDataset:
         """
         os.makedirs(AppConfig.ORIGINAL_MASKS, exist_ok=True)
 
-        image_files = [f for f in os.listdir(AppConfig.ORIGINAL_IMAGES)
+        image_files = [f for f in self.list_files(AppConfig.ORIGINAL_IMAGES)
                        if f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp'))]
 
         self._total_files = len(image_files)
         self._processed_files = 0
 
-        for img_file in image_files:
+        def process_file(img_file):
             img_path = os.path.join(AppConfig.ORIGINAL_IMAGES, img_file)
             base_name = os.path.splitext(img_file)[0]
             cache_key = f"{self.mask_cache_prefix}{base_name}"
 
-            self._processed_files += 1
-            self._progress = int(
-                (self._processed_files / self._total_files) * 100)
-
-            cached_mask = self.redis.get(cache_key)
-            if cached_mask:
-                mask = self.deserialize_mask(cached_mask)
-                mask_path = os.path.join(
-                    AppConfig.ORIGINAL_MASKS, f"{base_name}.jpg")
-                cv2.imwrite(mask_path, mask)
-                logger.info(f"Loaded mask from cache: {base_name}")
-                continue
-
             label_file = f"{base_name}.txt"
             label_path = os.path.join(AppConfig.ORIGINAL_LABELS, label_file)
 
             if not os.path.exists(label_path):
                 logger.warning(f"No label file found for {img_file}")
-                continue
+                return
 
             try:
                 mask = self.createmask.process_data(
@@ -227,17 +229,28 @@ class SplitDataset:
 
                 if mask is None:
                     logger.error(f"Failed to create mask for {img_file}")
-                    continue
+                    return
 
                 self.redis.set(cache_key, self.serialize_mask(mask), ex=86400)
 
-                self.create_mask.save_masks(
+                self.createmask.save_masks(
                     mask, img_path, AppConfig.ORIGINAL_MASKS)
-                logger.info(f"Generated and cached mask: {base_name}")
 
             except Exception as e:
                 logger.error(f"Error processing {img_file}: {str(e)}")
-                continue
+
+        # Progress is counted here, on the submitting thread, so the workers never update it concurrently.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, os.cpu_count())) as executor:
+            futures = [executor.submit(process_file, img_file) for img_file in image_files]
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+                self._processed_files += 1
+                self._progress = int(
+                    (self._processed_files / self._total_files) * 100)
+
+                if self._processed_files % 100 == 0 or self._processed_files == self._total_files:
+                    logger.info(
+                        f"Generating masks: {self._processed_files}/{self._total_files}")
 
     def start_split(self, data: Dict[str, any]):
         """
@@ -265,9 +278,9 @@ class SplitDataset:
             mask_dir = AppConfig.ORIGINAL_MASKS
 
             if not all([
-                os.path.exists(image_dir) and os.listdir(image_dir),
-                os.path.exists(seg_label_dir) and os.listdir(seg_label_dir),
-                os.path.exists(mask_dir) and os.listdir(mask_dir)
+                self.list_files(image_dir),
+                self.list_files(seg_label_dir),
+                self.list_files(mask_dir)
             ]):
                 logger.error("Required directories are missing or empty")
                 raise HTTPException(
@@ -299,7 +312,7 @@ class SplitDataset:
 
             self.clear_split_directories(split_dirs)
 
-            image_files = [f for f in os.listdir(
+            image_files = [f for f in self.list_files(
                 image_dir) if f.endswith('.jpg')]
             self._total_files = len(image_files) * 3
 
@@ -317,9 +330,9 @@ class SplitDataset:
                 val_images = image_files[train_end:val_end]
                 test_images = image_files[val_end:]
 
-                u_images = [f for f in os.listdir(
+                u_images = [f for f in self.list_files(
                     image_dir) if f.endswith('.jpg') and '_u_' in f]
-                s_images = [f for f in os.listdir(
+                s_images = [f for f in self.list_files(
                     image_dir) if f.endswith('.jpg') and '_s_' in f]
 
                 random.shuffle(u_images)
@@ -386,12 +399,12 @@ class SplitDataset:
         """
         for split in split_dirs.values():
             for dir_path in split.values():
-                for item in os.listdir(dir_path):
-                    item_path = os.path.join(dir_path, item)
-                    if os.path.isfile(item_path):
-                        os.unlink(item_path)
-                    elif os.path.isdir(item_path):
-                        shutil.rmtree(item_path)
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            os.unlink(entry.path)
+                        elif entry.is_dir():
+                            shutil.rmtree(entry.path)
 
     def group_by_class(self, image_files: List[str]) -> Dict[str, List[str]]:
         """
@@ -405,12 +418,8 @@ class SplitDataset:
         """
         class_images = {}
         for filename in image_files:
-            parts = filename.split('_')
-            class_name = '_'.join(parts[:-1])
-
-            if class_name not in class_images:
-                class_images[class_name] = []
-            class_images[class_name].append(filename)
+            class_name = filename.rpartition('_')[0]
+            class_images.setdefault(class_name, []).append(filename)
         return class_images
 
     def split_by_class(self, class_images: Dict[str, List[str]],
@@ -443,6 +452,28 @@ class SplitDataset:
 
         return train_images, val_images, test_images
 
+    def link_or_copy(self, src: str, dst: str) -> None:
+        """
+        Places src at dst as a hard link, so splitting does not duplicate the dataset on disk. Falls back to
+        copying when linking is not possible, e.g. across filesystems. An existing dst is removed first, so a
+        file from a previous split is never overwritten through a shared link.
+
+        Args:
+            src (str): Path of the source file.
+            dst (str): Path of the destination file.
+
+        Returns:
+            None
+        """
+
+        if os.path.lexists(dst):
+            os.unlink(dst)
+
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+
     def move_files(self, image_files: List[str],
                    src_img_dir: str, src_label_dir: str, src_mask_dir: str,
                    dest_dirs: Dict[str, str]):
@@ -464,7 +495,7 @@ class SplitDataset:
             if self._total_files == 1 and self._processed_files == 0:
                 break
 
-            shutil.copy(
+            self.link_or_copy(
                 os.path.join(src_img_dir, img_file),
                 os.path.join(dest_dirs['images'], img_file)
             )
@@ -473,7 +504,7 @@ class SplitDataset:
                 (self._processed_files / self._total_files) * 100)
 
             label_file = os.path.splitext(img_file)[0] + '.txt'
-            shutil.copy(
+            self.link_or_copy(
                 os.path.join(src_label_dir, label_file),
                 os.path.join(dest_dirs['labels'], label_file)
             )
@@ -482,7 +513,7 @@ class SplitDataset:
             self._progress = int(
                 (self._processed_files / self._total_files) * 100)
 
-            shutil.copy(
+            self.link_or_copy(
                 os.path.join(src_mask_dir, img_file),
                 os.path.join(dest_dirs['masks'], img_file)
             )
@@ -551,18 +582,18 @@ class SplitDataset:
 
         for attempt in range(max_retries):
             try:
-                for filename in os.listdir(dir_path):
-                    file_path = os.path.join(dir_path, filename)
-                    try:
-                        if os.path.isfile(file_path) or os.path.islink(file_path):
-                            os.unlink(file_path)
-                        elif os.path.isdir(file_path):
-                            shutil.rmtree(file_path)
-                    except Exception as e:
-                        logger.warning(
-                            f"Could not delete {file_path}: {str(e)}")
-                        if attempt == max_retries - 1:
-                            raise
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_file() or entry.is_symlink():
+                                os.unlink(entry.path)
+                            elif entry.is_dir(follow_symlinks=False):
+                                shutil.rmtree(entry.path)
+                        except Exception as e:
+                            logger.warning(
+                                f"Could not delete {entry.path}: {str(e)}")
+                            if attempt == max_retries - 1:
+                                raise
                 return
             except Exception as e:
                 raise HTTPException(
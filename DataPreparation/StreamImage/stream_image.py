@@ -1,27 +1,369 @@
+import asyncio
 import cv2
 import concurrent.futures
+import functools
+import math
 import numpy as np
 import os
+import queue
 import random
-import re
 import redis
-import pickle
 import shutil
+import tempfile
+import threading
 
 from fastapi import HTTPException, status
-from skimage.feature import local_binary_pattern
 from tqdm import tqdm
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 from Config.config import AppConfig
 from DataPreparation.CreateMask.createmask import CreateMask
 from Logger.logger import logger
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+try:
+    CUDA_AVAILABLE = cv2.cuda.getCudaEnabledDeviceCount() > 0
+except (AttributeError, cv2.error):
+    CUDA_AVAILABLE = False
+
+CACHE_BATCH_SIZE = 256
+# Images submitted to the worker pool at a time; the next window is queued while the previous one finishes.
+STREAM_WINDOW_SIZE = 2 * (os.cpu_count() or 1)
+PILL_NAME_TAGS = ('_s_', '_u_')
+MASK_SAMPLE_SIZE = 16
+BACKGROUND_COLOR = (145, 145, 145)
+# Blurring with sigma1 and then sigma2 equals a single blur with sqrt(sigma1^2 + sigma2^2), using the sigmas
+# OpenCV derives for the original 7x7 and 15x15 kernels.
+TEXTURE_BLUR_SIGMA = math.hypot(0.3 * ((7 - 1) * 0.5 - 1) + 0.8,
+                                0.3 * ((15 - 1) * 0.5 - 1) + 0.8)
+# The CUDA Gaussian filter needs an explicit kernel size; this is the size cv2.GaussianBlur derives for 8-bit images.
+TEXTURE_BLUR_KSIZE = int(round(TEXTURE_BLUR_SIGMA * 6 + 1)) | 1
+# Neighbour offsets of the P=8, R=2 LBP, computed and rounded the same way as skimage's local_binary_pattern.
+LBP_POINTS = 8
+LBP_RADIUS = 2
+LBP_ROW_OFFSETS = np.round(-LBP_RADIUS * np.sin(2 * np.pi * np.arange(LBP_POINTS, dtype=np.float64) / LBP_POINTS), 5)
+LBP_COL_OFFSETS = np.round(LBP_RADIUS * np.cos(2 * np.pi * np.arange(LBP_POINTS, dtype=np.float64) / LBP_POINTS), 5)
+# Multi-block LBP compares block sums instead of pixels; neighbours are in the same order as the pixel LBP.
+MB_LBP_BLOCK_SIZE = 3
+MB_LBP_NEIGHBOURS = ((0, 1), (-1, 1), (-1, 0), (-1, -1),
+                     (0, -1), (1, -1), (1, 0), (1, 1))
+
+
+def read_image(path: str, flags: int = cv2.IMREAD_COLOR) -> Optional[np.ndarray]:
+    """
+    Reads an image file with a single read and decodes it from memory, instead of letting cv2.imread open
+    the file once to detect the format and again to decode it. Like cv2.imread, returns None when the file
+    is missing, empty or cannot be decoded.
+
+    Args:
+        path (str): Path of the image file.
+        flags (int): The cv2.IMREAD_* decode flags.
+
+    Returns:
+        Optional[np.ndarray]: The decoded image, or None if it could not be read.
+    """
+
+    try:
+        buffer = np.fromfile(path, dtype=np.uint8)
+    except OSError:
+        return None
+    if buffer.size == 0:
+        return None
+    return cv2.imdecode(buffer, flags)
+
+
+@njit(cache=True, nogil=True)
+def bilinear_sample(image: np.ndarray, r: float, c: float) -> float:
+    """
+    Samples an image at a fractional position with bilinear interpolation, treating pixels outside
+    the image as 0. Mirrors skimage's bilinear interpolation in constant mode.
+
+    Args:
+        image (np.ndarray): The grayscale image to sample.
+        r (float): The row coordinate.
+        c (float): The column coordinate.
+
+    Returns:
+        float: The interpolated value.
+    """
+
+    rows, cols = image.shape
+    min_r = int(math.floor(r))
+    min_c = int(math.floor(c))
+    max_r = int(math.ceil(r))
+    max_c = int(math.ceil(c))
+    dr = r - min_r
+    dc = c - min_c
+
+    top_left = 0.0
+    top_right = 0.0
+    bottom_left = 0.0
+    bottom_right = 0.0
+    if 0 <= min_r < rows:
+        if 0 <= min_c < cols:
+            top_left = float(image[min_r, min_c])
+        if 0 <= max_c < cols:
+            top_right = float(image[min_r, max_c])
+    if 0 <= max_r < rows:
+        if 0 <= min_c < cols:
+            bottom_left = float(image[max_r, min_c])
+        if 0 <= max_c < cols:
+            bottom_right = float(image[max_r, max_c])
+
+    top = (1 - dc) * top_left + dc * top_right
+    bottom = (1 - dc) * bottom_left + dc * bottom_right
+    return (1 - dr) * top + dr * bottom
+
+
+@njit(cache=True, nogil=True)
+def local_binary_pattern_8_2(image: np.ndarray, table: np.ndarray) -> np.ndarray:
+    """
+    Computes the default (non rotation invariant) P=8, R=2 local binary pattern of a grayscale image,
+    producing the same codes as skimage's local_binary_pattern but directly as uint8. The sample
+    positions and interpolation weights only depend on the row or the column, so they are computed once
+    per image, and interior pixels skip the bounds checks. Each code is mapped through table as it is
+    stored, so label mappings such as the uniform patterns cost no extra pass. Compiled with nogil, so
+    the thread pool runs one image per core.
+
+    Args:
+        image (np.ndarray): The grayscale image.
+        table (np.ndarray): The 256-entry uint8 table applied to every code, LBP_DEFAULT_TABLE for the raw codes.
+
+    Returns:
+        np.ndarray: The LBP codes of every pixel.
+    """
+
+    rows, cols = image.shape
+    out = np.empty((rows, cols), dtype=np.uint8)
+
+    row_low = np.empty((LBP_POINTS, rows), dtype=np.int64)
+    row_high = np.empty((LBP_POINTS, rows), dtype=np.int64)
+    row_frac = np.empty((LBP_POINTS, rows), dtype=np.float64)
+    col_low = np.empty((LBP_POINTS, cols), dtype=np.int64)
+    col_high = np.empty((LBP_POINTS, cols), dtype=np.int64)
+    col_frac = np.empty((LBP_POINTS, cols), dtype=np.float64)
+    for i in range(LBP_POINTS):
+        for r in range(rows):
+            position = r + LBP_ROW_OFFSETS[i]
+            row_low[i, r] = int(math.floor(position))
+            row_high[i, r] = int(math.ceil(position))
+            row_frac[i, r] = position - row_low[i, r]
+        for c in range(cols):
+            position = c + LBP_COL_OFFSETS[i]
+            col_low[i, c] = int(math.floor(position))
+            col_high[i, c] = int(math.ceil(position))
+            col_frac[i, c] = position - col_low[i, c]
+
+    for r in range(rows):
+        interior_row = LBP_RADIUS <= r < rows - LBP_RADIUS
+        for c in range(cols):
+            center = float(image[r, c])
+            code = 0
+            if interior_row and LBP_RADIUS <= c < cols - LBP_RADIUS:
+                for i in range(LBP_POINTS):
+                    dr = row_frac[i, r]
+                    dc = col_frac[i, c]
+                    top = (1 - dc) * float(image[row_low[i, r], col_low[i, c]]) + \
+                        dc * float(image[row_low[i, r], col_high[i, c]])
+                    bottom = (1 - dc) * float(image[row_high[i, r], col_low[i, c]]) + \
+                        dc * float(image[row_high[i, r], col_high[i, c]])
+                    if (1 - dr) * top + dr * bottom - center >= 0:
+                        code |= 1 << i
+            else:
+                for i in range(LBP_POINTS):
+                    value = bilinear_sample(
+                        image, r + LBP_ROW_OFFSETS[i], c + LBP_COL_OFFSETS[i])
+                    if value - center >= 0:
+                        code |= 1 << i
+            out[r, c] = table[code]
+
+    return out
+
+
+def local_binary_pattern_8_2_vectorized(image: np.ndarray) -> np.ndarray:
+    """
+    NumPy version of local_binary_pattern_8_2, used when Numba is not installed. Each of the 8 neighbours
+    is sampled for the whole image at once from shifted views of a zero-padded copy and packed into its bit.
+    The 4 axial neighbours lie on the pixel grid and are compared directly as uint8, while the diagonal ones
+    are interpolated with the same floating point operations as skimage.
+
+    Args:
+        image (np.ndarray): The grayscale image.
+
+    Returns:
+        np.ndarray: The LBP codes of every pixel.
+    """
+
+    rows, cols = image.shape
+    padded = np.pad(image, LBP_RADIUS)
+
+    def shifted(source, dy, dx):
+        return source[LBP_RADIUS + dy:LBP_RADIUS + dy + rows, LBP_RADIUS + dx:LBP_RADIUS + dx + cols]
+
+    out = np.zeros((rows, cols), dtype=np.uint8)
+    bit = np.empty((rows, cols), dtype=np.uint8)
+    padded_float = None
+
+    for i in range(LBP_POINTS):
+        row_offset = LBP_ROW_OFFSETS[i]
+        col_offset = LBP_COL_OFFSETS[i]
+
+        if row_offset.is_integer() and col_offset.is_integer():
+            neighbour = shifted(padded, int(row_offset), int(col_offset))
+            np.greater_equal(neighbour, image, out=bit.view(np.bool_))
+        else:
+            if padded_float is None:
+                padded_float = padded.astype(np.float64)
+                center = shifted(padded_float, 0, 0)
+                row_index = np.arange(rows, dtype=np.float64)[:, None]
+                col_index = np.arange(cols, dtype=np.float64)[None, :]
+                # The interpolation reuses these buffers for all diagonal neighbours instead of allocating
+                # a temporary per arithmetic step. a * w equals w * a exactly, so the results match skimage.
+                top = np.empty((rows, cols), dtype=np.float64)
+                bottom = np.empty((rows, cols), dtype=np.float64)
+                scratch = np.empty((rows, cols), dtype=np.float64)
+
+            row_position = row_index + row_offset
+            col_position = col_index + col_offset
+            dr = row_position - np.floor(row_position)
+            dc = col_position - np.floor(col_position)
+
+            low_r, high_r = math.floor(row_offset), math.ceil(row_offset)
+            low_c, high_c = math.floor(col_offset), math.ceil(col_offset)
+
+            np.multiply(shifted(padded_float, low_r, low_c), 1 - dc, out=top)
+            np.multiply(shifted(padded_float, low_r, high_c), dc, out=scratch)
+            top += scratch
+            np.multiply(shifted(padded_float, high_r, low_c), 1 - dc, out=bottom)
+            np.multiply(shifted(padded_float, high_r, high_c), dc, out=scratch)
+            bottom += scratch
+
+            top *= 1 - dr
+            bottom *= dr
+            top += bottom
+            np.greater_equal(top, center, out=bit.view(np.bool_))
+
+        bit <<= np.uint8(i)
+        out |= bit
+
+    return out
+
+
+def multi_block_local_binary_pattern(image: np.ndarray, block_size: int = MB_LBP_BLOCK_SIZE) -> np.ndarray:
+    """
+    Computes the dense multi-block LBP of a grayscale image: the sum of the block_size x block_size block
+    centered on every pixel is compared with the sums of the 8 adjacent blocks. All block sums come from
+    one integral image, so each one costs four lookups regardless of the block size. Pixels outside the
+    image count as 0.
+
+    Args:
+        image (np.ndarray): The grayscale image.
+        block_size (int): The odd side length of the blocks.
+
+    Returns:
+        np.ndarray: The MB-LBP codes of every pixel.
+    """
+
+    rows, cols = image.shape
+    margin = block_size + block_size // 2
+    padded = cv2.copyMakeBorder(image, margin, margin, margin, margin,
+                                cv2.BORDER_CONSTANT, value=0)
+    integral = cv2.integral(padded)
+
+    block_sums = integral[block_size:, block_size:] - integral[:-block_size, block_size:] - \
+        integral[block_size:, :-block_size] + integral[:-block_size, :-block_size]
+
+    def block(dy, dx):
+        top = block_size + dy * block_size
+        left = block_size + dx * block_size
+        return block_sums[top:top + rows, left:left + cols]
+
+    center = block(0, 0)
+    out = np.zeros((rows, cols), dtype=np.uint8)
+    for i, (dy, dx) in enumerate(MB_LBP_NEIGHBOURS):
+        out |= (block(dy, dx) >= center).view(np.uint8) << np.uint8(i)
+
+    return out
+
+
+
+def uniform_lbp_table(points: int = LBP_POINTS) -> np.ndarray:
+    """
+    Builds the lookup table that maps every default LBP code to its non rotation invariant uniform
+    pattern label, numbered the same way as skimage's "nri_uniform" method. Uniform patterns (at most
+    two 0/1 transitions around the circle) get labels 0 to points * (points - 1) + 1, all others share
+    the last label.
+
+    Args:
+        points (int): The number of LBP sample points.
+
+    Returns:
+        np.ndarray: The uint8 table indexed by the default LBP code.
+    """
+
+    table = np.empty(1 << points, dtype=np.uint8)
+    for code in range(1 << points):
+        bits = [(code >> i) & 1 for i in range(points)]
+        changes = sum(bits[i] != bits[i + 1] for i in range(points - 1))
+        n_ones = sum(bits)
+
+        if changes > 2:
+            table[code] = points * (points - 1) + 2
+        elif n_ones == 0:
+            table[code] = 0
+        elif n_ones == points:
+            table[code] = points * (points - 1) + 1
+        else:
+            first_one = bits.index(1)
+            first_zero = bits.index(0)
+            rot_index = n_ones - first_zero if first_one == 0 else points - first_one
+            table[code] = 1 + (n_ones - 1) * points + rot_index
+
+    return table
+
+
+LBP_DEFAULT_TABLE = np.arange(1 << LBP_POINTS, dtype=np.uint8)
+LBP_UNIFORM_TABLE = uniform_lbp_table()
+
+class StreamRun():
+    def __init__(self):
+        """
+        Holds the state of a single run of a stream stage: the images prefetched from Redis, the images
+        waiting to be written back to Redis and the run's pending disk writes. Each run gets its own, so
+        stages running at the same time never see each other's cache entries or write errors. A run can be
+        stopped, and it signals finished once none of its tasks or writes are left.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+
+        self.cached_images = {}
+        self.pending_cache = []
+        self.cache_lock = threading.Lock()
+        self.pending_writes = 0
+        self.write_error = None
+        self.writes_done = threading.Condition()
+        self.stopped = False
+        self.finished = threading.Event()
+
 
 class StreamImage():
     def __init__(self):
         """
-        Initializes the StreamImage class with default values for progress tracking and Redis connection.
+        Initializes the StreamImage class with default values for progress tracking, Redis connection
+        and the worker pool shared by every stream stage. The OpenCV calls and the Numba kernels release
+        the GIL, so the image work runs in parallel on the pool's threads.
 
         Args:
             None
@@ -30,46 +372,79 @@ class StreamImage():
             None
         """
 
-        self.progress = 0
         self.processed = 0
         self.total = 0
         self.is_processing = False
         self.selected_mode = ""
+        self.stream_run = None
 
         self.redis = redis.Redis(
             host="redis",
             port=AppConfig.REDIS_PORT,
             db=3,
-            decode_responses=False
+            decode_responses=False,
+            socket_keepalive=True,
+            health_check_interval=30
         )
         self.cache_prefix = "stream_img:"
+        self.progress_lock = threading.Lock()
+        self.cuda_filters = threading.local()
+        self.write_queue = queue.Queue(maxsize=2 * os.cpu_count())
+        self.writer = threading.Thread(target=self.write_worker, daemon=True)
+        self.writer.start()
         self.createmask = CreateMask()
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=os.cpu_count())
+        self.sweep_trash()
+
+    def sweep_trash(self) -> None:
+        """
+        Deletes the output trees left in the trash directory by clear_output runs that did not finish,
+        e.g. because the server stopped while they were being deleted. Runs on the worker pool.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+
+        if not os.path.isdir(AppConfig.STREAM_IMAGES_TRASH):
+            return
+
+        with os.scandir(AppConfig.STREAM_IMAGES_TRASH) as entries:
+            for entry in entries:
+                self.executor.submit(shutil.rmtree, entry.path, ignore_errors=True)
 
-    def serialize_image(self, image: np.ndarray) -> bytes:
+    def shutdown(self) -> None:
         """
-        Serializes a NumPy image array into bytes using pickle.
+        Shuts down the worker pool shared by the stream stages and the disk writer thread.
 
         Args:
-            image (np.ndarray): The image array to serialize.
+            None
 
         Returns:
-            bytes: The serialized image as a byte stream.
+            None
         """
 
-        return pickle.dumps(image)
+        self.executor.shutdown(wait=True)
+        self.write_queue.put(None)
+        self.writer.join()
 
-    def deserialize_image(self, image_bytes: bytes) -> np.ndarray:
+    def mark_processed(self) -> None:
         """
-        Deserializes an image from a bytes object to a NumPy ndarray.
+        Counts one finished image. The increment is done under a lock because the workers finish
+        concurrently and a bare read-modify-write of the counter can lose updates.
 
         Args:
-            image_bytes (bytes): The serialized image data in bytes format.
+            None
 
         Returns:
-            np.ndarray: The deserialized image as a NumPy array.
+            None
         """
 
-        return pickle.loads(image_bytes)
+        with self.progress_lock:
+            self.processed += 1
 
     def get_cache_key(self, operation: str, filename: str) -> str:
         """
@@ -83,25 +458,122 @@ class StreamImage():
 
         return f"{self.cache_prefix}{operation}:{filename}"
 
-    def extract_pill_name(self, filename: str) -> str:
+    def get_lbp_cache_key(self, filename: str) -> str:
         """
-        Extracts the pill name from a given filename using a regular expression.
+        Generates the cache key of an LBP image. Methods other than the default one get their own
+        operation name, so switching AppConfig.LBP_METHOD never serves images of the other method.
+
+        Args:
+            filename (str): The name of the LBP image.
+
+        Returns:
+            str: The cache key of the LBP image.
+        """
+
+        if AppConfig.LBP_METHOD == "default":
+            return self.get_cache_key("lbp", filename)
+        return self.get_cache_key(f"lbp_{AppConfig.LBP_METHOD}", filename)
+
+    def prefetch_cache(self, run: StreamRun, keys: List[str]) -> None:
+        """
+        Loads the cached images of the given keys with batched MGET calls, so the workers can look them up
+        without paying a Redis round trip per image. Only the keys that are present are kept; the workers pop
+        them as they use them.
+
+        Args:
+            run (StreamRun): The run the images are loaded for.
+            keys (List[str]): The cache keys to load.
+
+        Returns:
+            None
+        """
+
+        for start in range(0, len(keys), CACHE_BATCH_SIZE):
+            batch = keys[start:start + CACHE_BATCH_SIZE]
+            for key, value in zip(batch, self.redis.mget(batch)):
+                if value is not None:
+                    run.cached_images[key] = value
+
+    def queue_cache(self, run: StreamRun, cache_key: str, image_bytes: bytes) -> None:
+        """
+        Queues an encoded image for Redis. Once CACHE_BATCH_SIZE images are queued, the worker that filled
+        the batch writes it in one pipeline, so the queue never holds more than one batch.
+
+        Args:
+            run (StreamRun): The run the image belongs to.
+            cache_key (str): The cache key of the image.
+            image_bytes (bytes): The encoded image.
+
+        Returns:
+            None
+        """
+
+        with run.cache_lock:
+            run.pending_cache.append((cache_key, image_bytes))
+            if len(run.pending_cache) < CACHE_BATCH_SIZE:
+                return
+            pending, run.pending_cache = run.pending_cache, []
+
+        self.write_cache(pending)
+
+    def flush_cache(self, run: StreamRun) -> None:
+        """
+        Writes the images the workers of a run still have queued to Redis.
+
+        Args:
+            run (StreamRun): The run whose images are written.
+
+        Returns:
+            None
+        """
+
+        with run.cache_lock:
+            pending, run.pending_cache = run.pending_cache, []
+
+        self.write_cache(pending)
+
+    def write_cache(self, pending: List[Tuple[str, bytes]]) -> None:
+        """
+        Writes encoded images to Redis with a single non-transactional pipeline.
+
+        Args:
+            pending (List[Tuple[str, bytes]]): The cache keys and encoded images to write.
+
+        Returns:
+            None
+        """
+
+        if not pending:
+            return
+
+        pipe = self.redis.pipeline(transaction=False)
+        for key, value in pending:
+            pipe.set(key, value, ex=86400)
+        pipe.execute()
+
+    @staticmethod
+    @functools.lru_cache(maxsize=65536)
+    def extract_pill_name(filename: str) -> str:
+        """
+        Extracts the pill name from a given filename, i.e. everything before the first "_s_" or "_u_" tag.
+        Results are memoized, since the same filenames are looked up by every stage.
 
         Args:
             filename (str): The filename from which to extract the pill name.
 
         Returns:
-            str: The extracted pill name, or "unknown_pill" if the pattern does not match.
+            str: The extracted pill name, or "unknown_pill" if the filename has no tag.
         """
 
-        match = re.match(r'^(.+?)_[su]_', filename)
-        if match:
-            return match.group(1)
+        positions = [position for position in (filename.find(tag, 1) for tag in PILL_NAME_TAGS)
+                     if position > 0]
+        if positions:
+            return filename[:min(positions)]
         return "unknown_pill"
 
-    def ensure_pill_directory(self, base_path: str, filename: str) -> str:
+    def pill_directory(self, base_path: str, filename: str) -> str:
         """
-        Ensures that a directory for the specified pill exists within the given base path.
+        Returns the directory of the specified pill within the given base path without touching the filesystem.
 
         Args:
             base_path (str): The base directory where pill directories are stored.
@@ -111,15 +583,155 @@ class StreamImage():
             str: The full path to the pill's directory.
         """
 
-        pill_name = self.extract_pill_name(filename)
-        pill_dir = os.path.join(base_path, pill_name)
-        os.makedirs(pill_dir, exist_ok=True)
-        return pill_dir
+        return os.path.join(base_path, self.extract_pill_name(filename))
+
+    def ensure_pill_directories(self, base_paths: List[str], filenames: List[str]) -> None:
+        """
+        Creates the pill directories needed by a batch of files up front, once per distinct pill,
+        so the per-image workers only have to join paths.
+
+        Args:
+            base_paths (List[str]): The base directories in which the pill directories are created.
+            filenames (List[str]): The filenames (or paths) from which to extract the pill names.
+
+        Returns:
+            None
+        """
+
+        pill_names = {self.extract_pill_name(os.path.basename(filename))
+                      for filename in filenames}
+        for base_path in base_paths:
+            for pill_name in pill_names:
+                os.makedirs(os.path.join(base_path, pill_name), exist_ok=True)
+
+    def write_bytes(self, path: str, data: bytes) -> None:
+        """
+        Writes an already encoded image to disk with unbuffered os.write calls, since the whole
+        payload is in memory anyway and Python's buffered file layer would only add a copy.
+
+        Args:
+            path (str): The file path to write to.
+            data (bytes): The bytes to write.
+
+        Returns:
+            None
+        """
+
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+
+    def queue_write(self, run: StreamRun, path: str, data: bytes) -> None:
+        """
+        Hands an encoded image to the disk writer thread, so the calling worker can move on to its next
+        image instead of waiting for the write. Blocks only while the bounded queue is full.
+
+        Args:
+            run (StreamRun): The run the image belongs to.
+            path (str): The file path to write to.
+            data (bytes): The bytes to write.
+
+        Returns:
+            None
+        """
+
+        with run.writes_done:
+            run.pending_writes += 1
+        self.write_queue.put((run, path, data))
+
+    def write_worker(self) -> None:
+        """
+        Runs on the disk writer thread and writes queued images until it receives None. The first failed
+        write of a run is kept so flush_writes can raise it on that run's stage.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+
+        while True:
+            item = self.write_queue.get()
+            if item is None:
+                self.write_queue.task_done()
+                return
+
+            run, path, data = item
+            try:
+                self.write_bytes(path, data)
+            except Exception as e:
+                logger.error(f"Error writing {path}: {str(e)}")
+                if run.write_error is None:
+                    run.write_error = e
+            finally:
+                with run.writes_done:
+                    run.pending_writes -= 1
+                    run.writes_done.notify_all()
+                self.write_queue.task_done()
+
+    def flush_writes(self, run: StreamRun) -> None:
+        """
+        Waits until the disk writer thread has written every image queued by a run and raises the run's
+        first write error, if any.
+
+        Args:
+            run (StreamRun): The run whose writes are waited for.
+
+        Returns:
+            None
+        """
+
+        with run.writes_done:
+            run.writes_done.wait_for(lambda: run.pending_writes == 0)
+        write_error, run.write_error = run.write_error, None
+        if write_error is not None:
+            raise write_error
+
+    def list_files(self, path: str, ext: str = "") -> List[str]:
+        """
+        Lists the names of the files directly inside a directory with a single scandir pass.
+
+        Args:
+            path (str): The directory to list.
+            ext (str): Only file names ending with this extension are returned.
+
+        Returns:
+            List[str]: The matching file names, or an empty list if the directory does not exist.
+        """
+
+        if not os.path.isdir(path):
+            return []
+
+        with os.scandir(path) as entries:
+            return [entry.name for entry in entries
+                    if entry.name.endswith(ext) and entry.is_file()]
+
+    def has_entries(self, path: str) -> bool:
+        """
+        Checks whether a directory exists and contains at least one entry without listing all of it.
+
+        Args:
+            path (str): The directory to check.
+
+        Returns:
+            bool: True if the directory exists and is not empty, otherwise False.
+        """
+
+        if not os.path.isdir(path):
+            return False
+
+        with os.scandir(path) as entries:
+            return next(entries, None) is not None
 
     async def get_data_availability(self):
         """
         Asynchronously checks the availability of various image data directories and their contents.
-        Generates masks if they don't exist or are invalid.
+        Generates masks if they don't exist or are invalid. Only a random sample of the masks is validated.
 
         Args:
             None
@@ -131,15 +743,15 @@ class StreamImage():
         def is_valid_mask(mask_path):
             """Check if a mask file is valid (contains only 0 and 255 values)"""
             try:
-                mask = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
+                mask = read_image(mask_path, cv2.IMREAD_GRAYSCALE)
                 if mask is None:
                     return False
-                return set(np.unique(mask)).issubset({0, 255})
+                return cv2.countNonZero(cv2.inRange(mask, 1, 254)) == 0
             except Exception:
                 return False
 
-        images_available = os.path.exists(AppConfig.ORIGINAL_IMAGES) and bool(
-            os.listdir(AppConfig.ORIGINAL_IMAGES))
+        image_files = self.list_files(AppConfig.ORIGINAL_IMAGES)
+        images_available = bool(image_files)
 
         if not images_available:
             return {
@@ -150,16 +762,16 @@ class StreamImage():
             }
 
         masks_available = False
-        if os.path.exists(AppConfig.ORIGINAL_MASKS) and os.listdir(AppConfig.ORIGINAL_MASKS):
-            valid_mask_count = 0
-            for mask_file in os.listdir(AppConfig.ORIGINAL_MASKS):
-                mask_path = os.path.join(AppConfig.ORIGINAL_MASKS, mask_file)
-                if is_valid_mask(mask_path):
-                    valid_mask_count += 1
-
-            image_count = len([f for f in os.listdir(AppConfig.ORIGINAL_IMAGES)
+        mask_files = self.list_files(AppConfig.ORIGINAL_MASKS)
+        if mask_files:
+            sampled_masks = random.sample(
+                mask_files, min(MASK_SAMPLE_SIZE, len(mask_files)))
+            samples_valid = all(is_valid_mask(os.path.join(AppConfig.ORIGINAL_MASKS, mask_file))
+                                for mask_file in sampled_masks)
+
+            image_count = len([f for f in image_files
                                if f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp'))])
-            masks_available = (valid_mask_count == image_count)
+            masks_available = samples_valid and len(mask_files) == image_count
 
         if not masks_available:
             logger.info(
@@ -168,17 +780,13 @@ class StreamImage():
             masks_available = True
 
         split_available = (
-            os.path.exists(AppConfig.CONSUMER_IMAGES) and
-            os.path.exists(AppConfig.REFERENCE_IMAGES) and
-            bool(os.listdir(AppConfig.CONSUMER_IMAGES)) and
-            bool(os.listdir(AppConfig.REFERENCE_IMAGES))
+            self.has_entries(AppConfig.CONSUMER_IMAGES) and
+            self.has_entries(AppConfig.REFERENCE_IMAGES)
         )
 
         background_changed_available = (
-            os.path.exists(AppConfig.CONSUMER_IMAGES_WO_BG) and
-            os.path.exists(AppConfig.REFERENCE_IMAGES_WO_BG) and
-            bool(os.listdir(AppConfig.CONSUMER_IMAGES_WO_BG)) and
-            bool(os.listdir(AppConfig.REFERENCE_IMAGES_WO_BG))
+            self.has_entries(AppConfig.CONSUMER_IMAGES_WO_BG) and
+            self.has_entries(AppConfig.REFERENCE_IMAGES_WO_BG)
         )
 
         return {
@@ -202,7 +810,8 @@ class StreamImage():
         image_files = [f for f in os.listdir(AppConfig.ORIGINAL_IMAGES)
                        if f.lower().endswith('.jpg')]
 
-        for img_file in image_files:
+        def process_file(img_file):
+            """Generate and save the mask of a single image"""
             img_path = os.path.join(AppConfig.ORIGINAL_IMAGES, img_file)
             base_name = os.path.splitext(img_file)[0]
 
@@ -211,7 +820,7 @@ class StreamImage():
 
             if not os.path.exists(label_path):
                 logger.warning(f"No label file found for {img_file}")
-                continue
+                return
 
             try:
                 mask = self.createmask.process_data(
@@ -219,7 +828,7 @@ class StreamImage():
 
                 if mask is None:
                     logger.error(f"Failed to create mask for {img_file}")
-                    continue
+                    return
 
                 self.createmask.save_masks(
                     mask, img_path, AppConfig.ORIGINAL_MASKS)
@@ -227,7 +836,47 @@ class StreamImage():
 
             except Exception as e:
                 logger.error(f"Error processing {img_file}: {str(e)}")
-                continue
+
+        # The files are generated on the worker pool while the event loop stays free to serve other requests.
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, process_file, img_file)
+                               for img_file in image_files))
+
+    def link_or_copy(self, src: str, dst: str) -> None:
+        """
+        Places src at dst as a hard link, so no image data is duplicated. Falls back to an in-kernel copy
+        (a reflink on filesystems that support it) when linking is not possible, e.g. across filesystems.
+        An existing dst is removed first, so a previous link is never truncated through the other name.
+
+        Args:
+            src (str): Path of the source file.
+            dst (str): Path of the destination file.
+
+        Returns:
+            None
+        """
+
+        if os.path.lexists(dst):
+            os.unlink(dst)
+
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(
+                        fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            shutil.copystat(src, dst)
+        except (AttributeError, OSError):
+            shutil.copy2(src, dst)
 
     async def split_consumer_reference(self):
         """
@@ -247,10 +896,8 @@ class StreamImage():
             os.makedirs(AppConfig.CONSUMER_MASK_IMAGES, exist_ok=True)
             os.makedirs(AppConfig.REFERENCE_MASK_IMAGES, exist_ok=True)
 
-            image_files = [f for f in os.listdir(
-                AppConfig.ORIGINAL_IMAGES) if f.endswith('.jpg')]
-            mask_files = [f for f in os.listdir(
-                AppConfig.ORIGINAL_MASKS) if f.endswith('.jpg')]
+            image_files = self.list_files(AppConfig.ORIGINAL_IMAGES, '.jpg')
+            mask_files = set(self.list_files(AppConfig.ORIGINAL_MASKS, '.jpg'))
 
             s_pairs = []
             u_pairs = []
@@ -275,45 +922,38 @@ class StreamImage():
                     detail="Not enough image pairs with 's' and 'u' tags found"
                 )
 
-            selected_s = random.choice(s_pairs)
-            selected_u = random.choice(u_pairs)
-
-            reference_pairs = [selected_s, selected_u]
-
-            consumer_pairs = []
-
-            for pair in s_pairs:
-                if pair != selected_s:
-                    consumer_pairs.append(pair)
-            for pair in u_pairs:
-                if pair != selected_u:
-                    consumer_pairs.append(pair)
-
-            for img_file, mask_file in reference_pairs:
-                ref_img_pill_dir = self.ensure_pill_directory(
-                    AppConfig.REFERENCE_IMAGES, img_file)
-                ref_mask_pill_dir = self.ensure_pill_directory(
-                    AppConfig.REFERENCE_MASK_IMAGES, mask_file)
-
-                shutil.copy2(
-                    os.path.join(AppConfig.ORIGINAL_IMAGES, img_file),
-                    os.path.join(ref_img_pill_dir, img_file))
-                shutil.copy2(
-                    os.path.join(AppConfig.ORIGINAL_MASKS, mask_file),
-                    os.path.join(ref_mask_pill_dir, mask_file))
-
-            for img_file, mask_file in consumer_pairs:
-                cons_img_pill_dir = self.ensure_pill_directory(
-                    AppConfig.CONSUMER_IMAGES, img_file)
-                cons_mask_pill_dir = self.ensure_pill_directory(
-                    AppConfig.CONSUMER_MASK_IMAGES, mask_file)
-
-                shutil.copy2(
-                    os.path.join(AppConfig.ORIGINAL_IMAGES, img_file),
-                    os.path.join(cons_img_pill_dir, img_file))
-                shutil.copy2(
-                    os.path.join(AppConfig.ORIGINAL_MASKS, mask_file),
-                    os.path.join(cons_mask_pill_dir, mask_file))
+            s_index = random.randrange(len(s_pairs))
+            u_index = random.randrange(len(u_pairs))
+
+            reference_pairs = [s_pairs[s_index], u_pairs[u_index]]
+
+            consumer_pairs = s_pairs[:s_index] + s_pairs[s_index + 1:] + \
+                u_pairs[:u_index] + u_pairs[u_index + 1:]
+
+            self.ensure_pill_directories(
+                [AppConfig.REFERENCE_IMAGES, AppConfig.REFERENCE_MASK_IMAGES],
+                [img_file for img_file, _ in reference_pairs])
+            self.ensure_pill_directories(
+                [AppConfig.CONSUMER_IMAGES, AppConfig.CONSUMER_MASK_IMAGES],
+                [img_file for img_file, _ in consumer_pairs])
+
+            sources = []
+            destinations = []
+            for pairs, images_dir, masks_dir in [
+                    (reference_pairs, AppConfig.REFERENCE_IMAGES,
+                     AppConfig.REFERENCE_MASK_IMAGES),
+                    (consumer_pairs, AppConfig.CONSUMER_IMAGES, AppConfig.CONSUMER_MASK_IMAGES)]:
+                for img_file, mask_file in pairs:
+                    sources.append(os.path.join(
+                        AppConfig.ORIGINAL_IMAGES, img_file))
+                    destinations.append(os.path.join(
+                        self.pill_directory(images_dir, img_file), img_file))
+                    sources.append(os.path.join(
+                        AppConfig.ORIGINAL_MASKS, mask_file))
+                    destinations.append(os.path.join(
+                        self.pill_directory(masks_dir, mask_file), mask_file))
+
+            list(self.executor.map(self.link_or_copy, sources, destinations))
 
             return {
                 "status": "success"
@@ -345,50 +985,68 @@ class StreamImage():
             os.makedirs(AppConfig.CONSUMER_IMAGES_WO_BG, exist_ok=True)
             os.makedirs(AppConfig.REFERENCE_IMAGES_WO_BG, exist_ok=True)
 
-            for mode in ["consumer", "reference"]:
-                paths = self.path_selector(mode)
-                image_files = [f for f in os.listdir(
-                    paths["images"]) if f.endswith('.jpg')]
+            bg_color = np.array(BACKGROUND_COLOR, dtype=np.uint8)
+
+            def process_file(img_file, paths, output_dir, run):
+                cache_key = self.get_cache_key("bg_change", img_file)
+                pill_name = self.extract_pill_name(img_file)
+                output_path = os.path.join(
+                    self.pill_directory(output_dir, img_file), img_file)
+
+                cached_img = run.cached_images.pop(cache_key, None)
+                if cached_img:
+                    self.queue_write(run, output_path, cached_img)
+                    return
 
-                bg_color = (145, 145, 145)
+                mask_file = img_file
+                img_path = os.path.join(
+                    paths["images"], pill_name, img_file)
+                mask_path = os.path.join(
+                    paths["masks"], pill_name, mask_file)
 
-                for img_file in image_files:
-                    cache_key = self.get_cache_key("bg_change", img_file)
-                    pill_name = self.extract_pill_name(img_file)
-                    output_dir = AppConfig.CONSUMER_IMAGES_WO_BG if mode == "consumer" else AppConfig.REFERENCE_IMAGES_WO_BG
-                    output_path = os.path.join(
-                        self.ensure_pill_directory(output_dir, img_file), img_file)
+                image = read_image(img_path)
+                mask = read_image(mask_path, cv2.IMREAD_GRAYSCALE)
 
-                    cached_img = self.redis.get(cache_key)
-                    if cached_img:
-                        with open(output_path, 'wb') as f:
-                            f.write(cached_img)
-                        continue
+                if mask.shape != image.shape[:2]:
+                    mask = cv2.resize(mask, (image.shape[1], image.shape[0]),
+                                      interpolation=cv2.INTER_NEAREST)
 
-                    mask_file = img_file
-                    img_path = os.path.join(
-                        paths["images"], pill_name, img_file)
-                    mask_path = os.path.join(
-                        paths["masks"], pill_name, mask_file)
+                output_image = np.where(
+                    (mask > 128)[:, :, None], image, bg_color)
 
-                    image = cv2.imread(img_path)
-                    mask = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
+                success, buffer = cv2.imencode('.jpg', output_image)
+                if not success:
+                    raise ValueError(f"Failed to encode {img_file}")
 
-                    mask = cv2.resize(mask, (image.shape[1], image.shape[0]))
-                    mask = cv2.threshold(mask, 128, 255, cv2.THRESH_BINARY)[
-                        1].astype(np.uint8)
+                image_bytes = buffer.tobytes()
+                self.queue_write(run, output_path, image_bytes)
+                self.queue_cache(run, cache_key, image_bytes)
 
-                    background = np.ones(image.shape, dtype=np.uint8)
-                    background[:, :] = bg_color
+            def bg_cache_keys(img_file):
+                return [self.get_cache_key("bg_change", img_file)]
+
+            def raise_error(future):
+                future.result()
+
+            def process_mode(mode):
+                paths = self.path_selector(mode)
+                image_files = self.list_files(paths["images"], '.jpg')
 
-                    foreground = cv2.bitwise_and(image, image, mask=mask)
-                    background = cv2.bitwise_and(
-                        background, background, mask=cv2.bitwise_not(mask))
-                    output_image = cv2.add(foreground, background)
+                output_dir = AppConfig.CONSUMER_IMAGES_WO_BG if mode == "consumer" else AppConfig.REFERENCE_IMAGES_WO_BG
+                self.ensure_pill_directories([output_dir], image_files)
 
-                    cv2.imwrite(output_path, output_image)
-                    self.redis.set(cache_key, self.serialize_image(
-                        output_image), ex=86400)
+                # Reads, compositing and encoding overlap across the I/O pool instead of running one file at a time.
+                run = StreamRun()
+                try:
+                    self.run_in_windows(run, image_files, functools.partial(
+                        process_file, paths=paths, output_dir=output_dir, run=run),
+                        bg_cache_keys, raise_error)
+                finally:
+                    self.flush_cache(run)
+                    self.flush_writes(run)
+
+            for mode in ["consumer", "reference"]:
+                await asyncio.to_thread(process_mode, mode)
 
             return {"status": "success"}
 
@@ -401,7 +1059,9 @@ class StreamImage():
 
     async def stop_stream_image(self) -> Dict[str, str]:
         """
-        Stop the current stream image creation process and clean up output directories.
+        Stop the current stream image creation process and clean up output directories. The output is
+        cleared only after the run has cancelled its queued images and written the running ones, so no
+        write of the run lands in a directory that is being swapped out.
 
         Args:
             None
@@ -413,11 +1073,13 @@ class StreamImage():
             return {"status": "error", "message": "No stream image process is currently running"}
 
         try:
+            run = self.stream_run
+            run.stopped = True
+            await asyncio.to_thread(run.finished.wait)
             self.is_processing = False
 
             self.clear_output()
 
-            self.progress = 0
             self.processed = 0
             self.total = 0
 
@@ -470,6 +1132,35 @@ class StreamImage():
                 detail=f"Invalid operation mode."
             )
 
+    def scan_files(self, directory: str, ext: str) -> List[str]:
+        """
+        Recursively collects the paths of the files with the given extension below a directory.
+        Uses os.scandir so the file type comes from the directory entry instead of a stat call per file.
+
+        Args:
+            directory (str): The directory to scan.
+            ext (str): File extension to filter by (e.g., '.jpg').
+
+        Returns:
+            List[str]: The full paths of the matching files, in no particular order.
+        """
+
+        files = []
+        pending = [directory]
+
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.name.endswith(ext) and entry.is_file():
+                            files.append(entry.path)
+            except FileNotFoundError:
+                continue
+
+        return files
+
     def load_files(self, dir1: str, dir2: str, ext1: str, ext2: str) -> Tuple[List[str], List[str]]:
         """
         Loads and returns lists of file paths from two directories, filtered by specified file extensions.
@@ -484,21 +1175,8 @@ class StreamImage():
             Tuple[List[str], List[str]]: Two sorted lists containing the full paths of the filtered files from each directory.
         """
 
-        files1 = []
-        files2 = []
-
-        for root, _, filenames in os.walk(dir1):
-            for f in filenames:
-                if f.endswith(ext1):
-                    files1.append(os.path.join(root, f))
-
-        for root, _, filenames in os.walk(dir2):
-            for f in filenames:
-                if f.endswith(ext2):
-                    files2.append(os.path.join(root, f))
-
-        files1 = sorted(files1)
-        files2 = sorted(files2)
+        files1 = sorted(self.scan_files(dir1, ext1))
+        files2 = sorted(self.scan_files(dir2, ext2))
 
         if len(files1) != len(files2):
             self.is_processing = False
@@ -509,34 +1187,36 @@ class StreamImage():
             )
         return files1, files2
 
-    def draw_bounding_box(self, in_img: np.ndarray, seg_map: np.ndarray, output_path: str) -> None:
+    @staticmethod
+    def draw_bounding_box(in_img: np.ndarray, seg_map: np.ndarray,
+                          output_path: Optional[str] = None) -> Optional[np.ndarray]:
         """
         Detects the largest connected component in the segmentation map, computes a square bounding box 
-        centered on this component, crops the corresponding region from the input image, and saves it to the specified output path.
+        centered on this component and crops the corresponding region from the input image.
+        The crop is saved to output_path only if one is given.
 
         Args:
             in_img (np.ndarray): The input image from which the object will be cropped.
             seg_map (np.ndarray): The segmentation map indicating object regions.
-            output_path (str): The file path where the cropped image will be saved.
+            output_path (Optional[str]): The file path where the cropped image will be saved.
 
         Returns:
-            None
+            Optional[np.ndarray]: The cropped image, or None if no object was found.
         """
 
         n_objects, _, stats, _ = cv2.connectedComponentsWithStats(
             seg_map, connectivity=8, ltype=cv2.CV_32S
         )
 
-        max_area = 0
-        max_x, max_y, max_w, max_h = None, None, None, None
+        if n_objects < 2:
+            return None
 
-        for i in range(1, n_objects):
-            x, y, w, h, area = stats[i]
-            if area > 100 and area > max_area:
-                max_x, max_y, max_w, max_h = x, y, w, h
-                max_area = area
+        areas = stats[1:, cv2.CC_STAT_AREA]
+        largest = int(np.argmax(areas))
+        max_area = areas[largest]
 
-        if max_area > 0:
+        if max_area > 100:
+            max_x, max_y, max_w, max_h = stats[largest + 1, :4]
             center_x = max_x + max_w / 2
             center_y = max_y + max_h / 2
             side_length = max(max_w, max_h)
@@ -549,9 +1229,80 @@ class StreamImage():
             obj = in_img[square_y:square_y_end, square_x:square_x_end]
 
             if obj.size != 0:
-                cv2.imwrite(output_path, obj)
+                if output_path is not None:
+                    cv2.imwrite(output_path, obj)
+                return obj
+
+        return None
+
+    @staticmethod
+    def create_rgb_image(color_path: str, mask_path: str, max_size: Tuple[int, int]) -> Optional[bytes]:
+        """
+        Crops the largest object of a color image using its mask, pads it to max_size and encodes it as JPEG.
+
+        Args:
+            color_path (str): Path to the color image.
+            mask_path (str): Path to the mask image.
+            max_size (Tuple[int, int]): Desired output image size as (height, width).
 
-    def process_image(self, args: Tuple[Tuple[str, str], str, Tuple[int, int]]) -> None:
+        Returns:
+            Optional[bytes]: The JPEG-encoded RGB image, or None if no object was found.
+        """
+
+        color_img = read_image(str(color_path), cv2.IMREAD_COLOR)
+        mask_img = read_image(str(mask_path), cv2.IMREAD_GRAYSCALE)
+
+        cropped_img = StreamImage.draw_bounding_box(color_img, mask_img)
+        if cropped_img is None:
+            return None
+
+        if cropped_img.shape[0] != max_size[0] or cropped_img.shape[1] != max_size[1]:
+            height_diff = max_size[0] - cropped_img.shape[0]
+            width_diff = max_size[1] - cropped_img.shape[1]
+
+            top = height_diff // 2
+            bottom = height_diff - top
+            left = width_diff // 2
+            right = width_diff - left
+
+            bg_color = BACKGROUND_COLOR
+
+            cropped_img = cv2.copyMakeBorder(
+                cropped_img,
+                top, bottom, left, right,
+                cv2.BORDER_CONSTANT,
+                value=bg_color
+            )
+
+        success, buffer = cv2.imencode('.jpg', cropped_img)
+        if not success:
+            raise ValueError(f"Failed to encode {os.path.basename(color_path)}")
+        return buffer.tobytes()
+
+    @staticmethod
+    def get_crop_size(color_path: str, mask_path: str) -> Tuple[int, int]:
+        """
+        Computes the size of the bounding box crop of a single color and mask image pair.
+
+        Args:
+            color_path (str): Path to the color image.
+            mask_path (str): Path to the mask image.
+
+        Returns:
+            Tuple[int, int]: The crop size as (height, width), or (0, 0) if no object was found.
+        """
+
+        # Only the image size matters here, and a grayscale decode skips libjpeg's chroma upsampling
+        # and colour conversion.
+        color_img = read_image(str(color_path), cv2.IMREAD_GRAYSCALE)
+        mask_img = read_image(str(mask_path), cv2.IMREAD_GRAYSCALE)
+
+        cropped_img = StreamImage.draw_bounding_box(color_img, mask_img)
+        if cropped_img is None:
+            return 0, 0
+        return cropped_img.shape[:2]
+
+    def process_image(self, args: Tuple[Tuple[str, str], str, Tuple[int, int]], run: StreamRun) -> Tuple[str, bytes]:
         """
         Processes an image by reading color and mask files, drawing bounding boxes, resizing, caching, and saving the result.
 
@@ -561,203 +1312,242 @@ class StreamImage():
                     - (color_path, mask_path): Paths to the color image and mask image files.
                     - rgb_path: Path to the RGB image directory.
                     - max_size: Desired output image size as (height, width).
+            run (StreamRun): The run the image belongs to.
 
         Returns:
-            None
+            Tuple[str, bytes]: Path of the saved RGB image and its JPEG-encoded bytes.
         """
 
         (color_path, mask_path), rgb_path, max_size = args
         output_name = os.path.basename(color_path)
         cache_key = self.get_cache_key("rgb", output_name)
 
-        cached_img = self.redis.get(cache_key)
+        cached_img = run.cached_images.pop(cache_key, None)
         if cached_img:
-            output_pill_dir = self.ensure_pill_directory(rgb_path, output_name)
-            with open(os.path.join(output_pill_dir, output_name), 'wb') as f:
-                f.write(cached_img)
-            self.processed += 1
-            self.progress = int((self.processed / self.total) * 100)
-            return
+            output_pill_dir = self.pill_directory(rgb_path, output_name)
+            output_file = os.path.join(output_pill_dir, output_name)
+            self.queue_write(run, output_file, cached_img)
+            self.mark_processed()
+            return output_file, cached_img
 
-        output_pill_dir = self.ensure_pill_directory(rgb_path, output_name)
+        output_pill_dir = self.pill_directory(rgb_path, output_name)
         output_file = os.path.join(output_pill_dir, output_name)
-        color_img = cv2.imread(str(color_path), 1)
-        mask_img = cv2.imread(str(mask_path), 0)
 
-        self.draw_bounding_box(color_img, mask_img, output_file)
+        image_bytes = StreamImage.create_rgb_image(color_path, mask_path, max_size)
+        if image_bytes is None:
+            raise ValueError(f"No object found in {output_name}")
 
-        saved_img = cv2.imread(output_file)
-        if saved_img is not None and (saved_img.shape[0] != max_size[0] or saved_img.shape[1] != max_size[1]):
-            height_diff = max_size[0] - saved_img.shape[0]
-            width_diff = max_size[1] - saved_img.shape[1]
+        self.queue_write(run, output_file, image_bytes)
+        self.queue_cache(run, cache_key, image_bytes)
 
-            top = height_diff // 2
-            bottom = height_diff - top
-            left = width_diff // 2
-            right = width_diff - left
+        self.mark_processed()
+        return output_file, image_bytes
 
-            bg_color = (145, 145, 145)
+    def get_max_crop_size(self, color_images: List[str], mask_images: List[str]) -> Tuple[int, int]:
+        """
+        Computes the largest bounding box crop size over all color and mask image pairs.
 
-            resized_img = cv2.copyMakeBorder(
-                saved_img,
-                top, bottom, left, right,
-                cv2.BORDER_CONSTANT,
-                value=bg_color
-            )
+        Args:
+            color_images (List[str]): Paths of the color images.
+            mask_images (List[str]): Paths of the corresponding mask images.
+
+        Returns:
+            Tuple[int, int]: The maximum crop size as (height, width).
+        """
 
-            cv2.imwrite(output_file, resized_img)
+        max_height = 0
+        max_width = 0
 
-        with open(output_file, 'rb') as f:
-            self.redis.set(cache_key, f.read(), ex=86400)
+        for h, w in self.executor.map(StreamImage.get_crop_size, color_images, mask_images):
+            max_height = max(max_height, h)
+            max_width = max(max_width, w)
 
-        self.processed += 1
-        self.progress = int((self.processed / self.total) * 100)
+        return max_height, max_width
 
-    def save_rgb_images(self, bg_changed_path: str, masks_path: str, rgb_path: str) -> None:
+    @staticmethod
+    def create_contour_image(gray: np.ndarray) -> Optional[bytes]:
         """
-        Processes and saves RGB images with bounding boxes drawn from the given background-changed and mask image directories.
+        Computes the Sobel gradient contour image of a grayscale cropped image and encodes it as JPEG
+        at AppConfig.STREAM_JPEG_QUALITY.
 
         Args:
-            bg_changed_path (str): Path to the directory containing background-changed color images.
-            masks_path (str): Path to the directory containing mask images.
-            rgb_path (str): Path to the directory where processed RGB images will be saved.
+            gray (np.ndarray): The grayscale input image to process.
 
         Returns:
-            None
+            Optional[bytes]: The JPEG-encoded contour image, or None if encoding failed.
         """
 
-        color_images, mask_images = self.load_files(
-            bg_changed_path, masks_path, ".jpg", ".jpg"
-        )
-        self.total = len(color_images)
-        self.processed = 0
-        self.progress = 0
+        grad_x = cv2.Sobel(gray, cv2.CV_16S, 1, 0, ksize=3)
+        grad_y = cv2.Sobel(gray, cv2.CV_16S, 0, 1, ksize=3)
+        return StreamImage.encode_contour_image(grad_x, grad_y)
 
-        max_height = 0
-        max_width = 0
+    @staticmethod
+    def encode_contour_image(grad_x: np.ndarray, grad_y: np.ndarray) -> Optional[bytes]:
+        """
+        Combines the Sobel gradients into the contour image and encodes it as JPEG at AppConfig.STREAM_JPEG_QUALITY.
 
-        for color_path, mask_path in zip(color_images, mask_images):
-            color_img = cv2.imread(str(color_path), 1)
-            mask_img = cv2.imread(str(mask_path), 0)
+        Args:
+            grad_x (np.ndarray): The CV_16S horizontal Sobel gradient.
+            grad_y (np.ndarray): The CV_16S vertical Sobel gradient.
 
-            temp_file = os.path.join("/tmp", os.path.basename(color_path))
-            self.draw_bounding_box(color_img, mask_img, temp_file)
+        Returns:
+            Optional[bytes]: The JPEG-encoded contour image, or None if encoding failed.
+        """
+
+        abs_grad_x = cv2.convertScaleAbs(grad_x)
+        abs_grad_y = cv2.convertScaleAbs(grad_y)
+        edges = cv2.addWeighted(abs_grad_x, 1.5, abs_grad_y, 2.5, 0)
+
+        success, buffer = cv2.imencode(
+            '.jpg', edges, [cv2.IMWRITE_JPEG_QUALITY, AppConfig.STREAM_JPEG_QUALITY])
+        if not success:
+            return None
+        return buffer.tobytes()
 
-            cropped_img = cv2.imread(temp_file)
-            if cropped_img is not None:
-                h, w = cropped_img.shape[:2]
-                max_height = max(max_height, h)
-                max_width = max(max_width, w)
+    def get_cuda_filters(self) -> Dict[str, any]:
+        """
+        Returns the CUDA filters of the calling worker thread, creating them on first use so every thread
+        reuses its own filters and their device buffers across images.
 
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+        Args:
+            None
+
+        Returns:
+            Dict[str, any]: The texture Gaussian filter and the horizontal and vertical Sobel filters.
+        """
+
+        filters = getattr(self.cuda_filters, "filters", None)
+        if filters is None:
+            filters = {
+                "blur": cv2.cuda.createGaussianFilter(
+                    cv2.CV_8UC1, cv2.CV_8UC1, (TEXTURE_BLUR_KSIZE, TEXTURE_BLUR_KSIZE), TEXTURE_BLUR_SIGMA),
+                "sobel_x": cv2.cuda.createSobelFilter(cv2.CV_8UC1, cv2.CV_16SC1, 1, 0, ksize=3),
+                "sobel_y": cv2.cuda.createSobelFilter(cv2.CV_8UC1, cv2.CV_16SC1, 0, 1, ksize=3)
+            }
+            self.cuda_filters.filters = filters
+        return filters
 
-        max_size = (max_height, max_width)
+    def create_contour_image_cuda(self, gray: np.ndarray) -> Optional[bytes]:
+        """
+        Computes the contour image like create_contour_image, with the Sobel filters running on the GPU.
 
-        args_list = [((color_path, mask_path), rgb_path, max_size)
-                     for color_path, mask_path in zip(color_images, mask_images)]
+        Args:
+            gray (np.ndarray): The grayscale input image to process.
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
-            futures = []
-            for args in args_list:
-                futures.append(executor.submit(self.process_image, args))
+        Returns:
+            Optional[bytes]: The JPEG-encoded contour image, or None if encoding failed.
+        """
 
-            for _ in tqdm(concurrent.futures.as_completed(futures),
-                          total=len(args_list), desc="RGB images"):
-                pass
+        filters = self.get_cuda_filters()
+        gpu_gray = cv2.cuda_GpuMat()
+        gpu_gray.upload(gray)
+        grad_x = filters["sobel_x"].apply(gpu_gray).download()
+        grad_y = filters["sobel_y"].apply(gpu_gray).download()
+        return StreamImage.encode_contour_image(grad_x, grad_y)
 
-    def create_contour_images(self, args) -> None:
+    def create_contour_images(self, args, run: StreamRun) -> None:
         """
-        Processes a cropped image to generate its contour image using Canny edge detection,
+        Processes a grayscale cropped image to generate its contour image from its Sobel gradients,
         saves the result to the specified output path, and caches the image in Redis for future use.
 
         Args:
             args (tuple): A tuple containing:
-                - cropped_image (np.ndarray): The input image to process.
+                - gray_image (np.ndarray): The grayscale input image to process.
                 - output_path (str): The file path where the processed image will be saved.
+            run (StreamRun): The run the image belongs to.
 
         Returns:
             None
         """
 
         try:
-            cropped_image, output_path = args
+            gray_image, output_path = args
             output_name = os.path.basename(output_path)
             cache_key = self.get_cache_key("contour", output_name)
 
-            cached_img = self.redis.get(cache_key)
+            cached_img = run.cached_images.pop(cache_key, None)
             if cached_img:
-                with open(output_path, 'wb') as f:
-                    f.write(cached_img)
-                self.processed += 1
-                self.progress = int((self.processed / self.total) * 100)
+                self.queue_write(run, output_path, cached_img)
+                self.mark_processed()
                 return
 
-            if cropped_image is None:
+            if gray_image is None:
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail="Failed to read input image."
                 )
 
-            gray = cv2.cvtColor(cropped_image, cv2.COLOR_BGR2GRAY)
-            grad_x = cv2.Sobel(gray, cv2.CV_16S, 1, 0, ksize=3)
-            grad_y = cv2.Sobel(gray, cv2.CV_16S, 0, 1, ksize=3)
-            abs_grad_x = cv2.convertScaleAbs(grad_x)
-            abs_grad_y = cv2.convertScaleAbs(grad_y)
-            edges = cv2.addWeighted(abs_grad_x, 1.5, abs_grad_y, 2.5, 0)
-            success = cv2.imwrite(output_path, edges)
-
-            if success:
-                with open(output_path, 'rb') as f:
-                    self.redis.set(cache_key, f.read(), ex=86400)
+            if CUDA_AVAILABLE:
+                image_bytes = self.create_contour_image_cuda(gray_image)
             else:
+                image_bytes = StreamImage.create_contour_image(gray_image)
+            if image_bytes is None:
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Failed to write image to {output_path}"
+                    detail=f"Failed to encode image for {output_path}"
                 )
 
-            self.processed += 1
-            self.progress = int((self.processed / self.total) * 100)
+            self.queue_write(run, output_path, image_bytes)
+            self.queue_cache(run, cache_key, image_bytes)
+
+            self.mark_processed()
         except Exception as e:
             logger.error(f"Error processing contour image: {str(e)}")
             raise
 
-    def save_contour_images(self, rgb_path: str, contour_path: str) -> None:
+    @staticmethod
+    def create_texture_image(gray: np.ndarray) -> Optional[bytes]:
         """
-        Processes all JPEG images in the specified directory, extracts pill names from filenames,
-        and saves contour images to corresponding subdirectories.
+        Computes the texture image of a grayscale cropped image, its contrast-boosted difference from
+        a blurred copy, and encodes it as JPEG. Does not touch any instance state.
 
         Args:
-            rgb_path (str): Path to the directory containing RGB images.
-            contour_path (str): Path to the directory where contour images will be saved.
+            gray (np.ndarray): The grayscale input image to process.
 
         Returns:
-            None
+            Optional[bytes]: The JPEG-encoded texture image, or None if encoding failed.
         """
 
-        args_list = []
-        for root, _, filenames in os.walk(rgb_path):
-            for img_file in filenames:
-                if img_file.endswith(".jpg"):
-                    img_path = os.path.join(root, img_file)
-                    pill_name = self.extract_pill_name(img_file)
-                    contour_pill_dir = os.path.join(contour_path, pill_name)
-                    os.makedirs(contour_pill_dir, exist_ok=True)
-                    output_path = os.path.join(contour_pill_dir, img_file)
+        blurred_img = cv2.GaussianBlur(gray, (0, 0), TEXTURE_BLUR_SIGMA)
+        # Saturating 15 * (gray - blurred) in one pass equals subtracting with saturation and then scaling.
+        return StreamImage.encode_texture_image(cv2.addWeighted(gray, 15, blurred_img, -15, 0))
 
-                    args_list.append(
-                        (cv2.imread(img_path, cv2.IMREAD_COLOR), output_path))
+    @staticmethod
+    def encode_texture_image(texture_img: np.ndarray) -> Optional[bytes]:
+        """
+        Encodes the contrast-boosted texture image as JPEG at AppConfig.STREAM_JPEG_QUALITY.
 
-        self.total = len(args_list)
-        self.processed = 0
-        self.progress = 0
+        Args:
+            texture_img (np.ndarray): The saturated, 15x scaled difference between the image and its blurred copy.
+
+        Returns:
+            Optional[bytes]: The JPEG-encoded texture image, or None if encoding failed.
+        """
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
-            futures = [executor.submit(
-                self.create_contour_images, args) for args in args_list]
-            concurrent.futures.wait(futures)
+        success, buffer = cv2.imencode(
+            '.jpg', texture_img, [cv2.IMWRITE_JPEG_QUALITY, AppConfig.STREAM_JPEG_QUALITY])
+        if not success:
+            return None
+        return buffer.tobytes()
 
-    def create_texture_images(self, args) -> None:
+    def create_texture_image_cuda(self, gray: np.ndarray) -> Optional[bytes]:
+        """
+        Computes the texture image like create_texture_image, with the blur and weighted difference running on the GPU.
+
+        Args:
+            gray (np.ndarray): The grayscale input image to process.
+
+        Returns:
+            Optional[bytes]: The JPEG-encoded texture image, or None if encoding failed.
+        """
+
+        gpu_image = cv2.cuda_GpuMat()
+        gpu_image.upload(gray)
+        gpu_blurred = self.get_cuda_filters()["blur"].apply(gpu_image)
+        return StreamImage.encode_texture_image(
+            cv2.cuda.addWeighted(gpu_image, 15, gpu_blurred, -15, 0).download())
+
+    def create_texture_images(self, args, run: StreamRun) -> None:
         """
         Generates a texture-enhanced image from a cropped input image, saves it to disk, and caches the result in Redis.
 
@@ -765,6 +1555,7 @@ class StreamImage():
             args (tuple): A tuple containing:
                 - cropped_image (np.ndarray): The input cropped image as a NumPy array.
                 - output_path (str): The file path where the processed image will be saved.
+            run (StreamRun): The run the image belongs to.
 
         Returns:
             None
@@ -774,66 +1565,66 @@ class StreamImage():
         output_name = os.path.basename(output_path)
         cache_key = self.get_cache_key("texture", output_name)
 
-        if self.redis.exists(cache_key):
-            with open(output_path, 'wb') as f:
-                f.write(self.redis.get(cache_key))
-            self.processed += 1
-            self.progress = int((self.processed / self.total) * 100)
+        cached_img = run.cached_images.pop(cache_key, None)
+        if cached_img:
+            self.queue_write(run, output_path, cached_img)
+            self.mark_processed()
             return
 
-        blurred_img = cv2.GaussianBlur(cropped_image, (7, 7), 0)
-        blurred_img = cv2.GaussianBlur(blurred_img, (15, 15), 0)
-        sub_img = cv2.subtract(cropped_image, blurred_img)
-        result = sub_img * 15
+        if CUDA_AVAILABLE:
+            image_bytes = self.create_texture_image_cuda(cropped_image)
+        else:
+            image_bytes = StreamImage.create_texture_image(cropped_image)
+        if image_bytes is None:
+            raise ValueError(f"Failed to encode {output_name}")
 
-        cv2.imwrite(output_path, result)
-        with open(output_path, 'rb') as f:
-            self.redis.set(cache_key, f.read(), ex=86400)
+        self.queue_write(run, output_path, image_bytes)
+        self.queue_cache(run, cache_key, image_bytes)
 
-        self.processed += 1
-        self.progress = int((self.processed / self.total) * 100)
+        self.mark_processed()
 
-    def save_texture_images(self, rgb_path: str, texture_path: str) -> None:
+    @staticmethod
+    def create_lbp_image(img_gray: np.ndarray, method: str) -> Optional[bytes]:
         """
-        Processes RGB images from the specified directory, generates texture images, and saves them to the target directory.
+        Computes the LBP image of a grayscale image and encodes it as JPEG.
+        The Numba kernel releases the GIL; the NumPy fallback and the multi-block LBP are whole-array
+        operations, which release it for most of their work.
 
         Args:
-            rgb_path (str): Path to the directory containing RGB images.
-            texture_path (str): Path to the directory where texture images will be saved.
+            img_gray (np.ndarray): Grayscale image to process.
+            method (str): The LBP method, "default" for the pixel LBP, "uniform" for its uniform pattern
+                labels or "mb" for the multi-block LBP.
 
         Returns:
-            None
+            Optional[bytes]: The JPEG-encoded LBP image, or None if encoding failed.
         """
 
-        args_list = []
-        for root, _, filenames in os.walk(rgb_path):
-            for img_file in filenames:
-                if img_file.endswith(".jpg"):
-                    img_path = os.path.join(root, img_file)
-                    pill_name = self.extract_pill_name(img_file)
-                    texture_pill_dir = os.path.join(texture_path, pill_name)
-                    os.makedirs(texture_pill_dir, exist_ok=True)
-                    output_path = os.path.join(texture_pill_dir, img_file)
-
-                    args_list.append((cv2.imread(img_path, 0), output_path))
-
-        self.total = len(args_list)
-        self.processed = 0
-        self.progress = 0
+        if method == "mb":
+            lbp_image = multi_block_local_binary_pattern(img_gray)
+        elif NUMBA_AVAILABLE:
+            table = LBP_UNIFORM_TABLE if method == "uniform" else LBP_DEFAULT_TABLE
+            lbp_image = local_binary_pattern_8_2(img_gray, table)
+        else:
+            lbp_image = local_binary_pattern_8_2_vectorized(img_gray)
+            if method == "uniform":
+                lbp_image = cv2.LUT(lbp_image, LBP_UNIFORM_TABLE)
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
-            futures = [executor.submit(
-                self.create_texture_images, args) for args in args_list]
-            concurrent.futures.wait(futures)
+        success, buffer = cv2.imencode('.jpg', lbp_image)
+        if not success:
+            return None
+        return buffer.tobytes()
 
-    def process_lbp_image(self, args) -> None:
+    def process_lbp_image(self, args, run: StreamRun) -> None:
         """
         Processes a grayscale image using Local Binary Pattern (LBP) and saves the result.
+        AppConfig.LBP_METHOD selects the pixel LBP ("default"), its uniform pattern labels ("uniform") or the
+        multi-block LBP ("mb").
 
         Args:
             args (tuple): A tuple containing:
                 - img_gray (np.ndarray): Grayscale image to process.
                 - dst_image_path (str): Path to save the processed LBP image.
+            run (StreamRun): The run the image belongs to.
 
         Returns:
             None
@@ -841,59 +1632,174 @@ class StreamImage():
 
         img_gray, dst_image_path = args
         output_name = os.path.basename(dst_image_path)
-        cache_key = self.get_cache_key("lbp", output_name)
+        cache_key = self.get_lbp_cache_key(output_name)
 
-        if self.redis.exists(cache_key):
-            with open(dst_image_path, 'wb') as f:
-                f.write(self.redis.get(cache_key))
-            self.processed += 1
-            self.progress = int((self.processed / self.total) * 100)
+        cached_img = run.cached_images.pop(cache_key, None)
+        if cached_img:
+            self.queue_write(run, dst_image_path, cached_img)
+            self.mark_processed()
             return
 
-        lbp_image = local_binary_pattern(
-            image=img_gray, P=8, R=2, method="default")
-        lbp_image = np.clip(lbp_image, 0, 255)
+        image_bytes = StreamImage.create_lbp_image(img_gray, AppConfig.LBP_METHOD)
+        if image_bytes is None:
+            raise ValueError(f"Failed to encode {output_name}")
+
+        self.queue_write(run, dst_image_path, image_bytes)
+        self.queue_cache(run, cache_key, image_bytes)
+
+        self.mark_processed()
 
-        cv2.imwrite(dst_image_path, lbp_image)
-        with open(dst_image_path, 'rb') as f:
-            self.redis.set(cache_key, f.read(), ex=86400)
+    def process_derived_images(self, img_path: str, image_bytes: bytes, paths: Dict[str, str],
+                               run: StreamRun) -> None:
+        """
+        Runs the contour, texture and LBP stages of a single RGB image one after another on the calling
+        worker. A failing stage is logged and does not keep the other two from running.
+
+        Args:
+            img_path (str): Path of the RGB image to derive the stream images from.
+            image_bytes (bytes): The JPEG-encoded RGB image, decoded here instead of reading the file back.
+                All three stages work on its luminance, so only the grayscale plane is decoded, once.
+            paths (Dict[str, str]): The paths returned by path_selector for the current mode.
+            run (StreamRun): The run the images belong to.
+
+        Returns:
+            None
+        """
+
+        img_file = os.path.basename(img_path)
+        buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+        gray_img = cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE)
+
+        contour_file = os.path.join(
+            self.pill_directory(paths["contour"], img_file), img_file)
+        texture_file = os.path.join(
+            self.pill_directory(paths["texture"], img_file), img_file)
+        lbp_file = os.path.join(
+            self.pill_directory(paths["lbp"], img_file), f"lbp_{img_file}")
+
+        for stage, args in [(self.create_contour_images, (gray_img, contour_file)),
+                            (self.create_texture_images, (gray_img, texture_file)),
+                            (self.process_lbp_image, (gray_img, lbp_file))]:
+            try:
+                stage(args, run)
+            except Exception as e:
+                logger.error(f"Error processing derived image of {img_file}: {str(e)}")
+
+    def process_stream_image(self, args: Tuple[Tuple[str, str], str, Tuple[int, int]],
+                             paths: Dict[str, str], run: StreamRun) -> None:
+        """
+        Creates the RGB image of a single color and mask pair and then its contour, texture and LBP images
+        within the same task, so no derived work queues up behind the remaining RGB images.
 
-        self.processed += 1
-        self.progress = int((self.processed / self.total) * 100)
+        Args:
+            args (Tuple[Tuple[str, str], str, Tuple[int, int]]): The arguments passed to process_image.
+            paths (Dict[str, str]): The paths returned by path_selector for the current mode.
+            run (StreamRun): The run the images belong to.
 
-    def save_lbp_images(self, rgb_path: str, lbp_path: str) -> None:
+        Returns:
+            None
         """
-        Processes all JPEG images in the specified directory, computes their Local Binary Pattern (LBP) representations,
-        and saves the resulting images to a target directory organized by pill name.
+
+        rgb_file, image_bytes = self.process_image(args, run)
+        self.process_derived_images(rgb_file, image_bytes, paths, run)
+
+    def run_in_windows(self, run: StreamRun, items: List[any], task: Callable[[any], None],
+                       cache_keys: Callable[[any], List[str]],
+                       on_done: Callable[[concurrent.futures.Future], None]) -> None:
+        """
+        Runs task for every item on the worker pool in windows of STREAM_WINDOW_SIZE, with at most two
+        windows in flight; the next window is queued while the previous one finishes. The cached images of a
+        window are prefetched right before it is submitted, so the run never holds more than those two
+        windows of images. If the run is stopped or on_done raises, the queued tasks are cancelled and the
+        running ones are waited for, so no task of the run is still writing when the caller moves on.
 
         Args:
-            rgb_path (str): Path to the directory containing the original RGB images.
-            lbp_path (str): Path to the directory where the LBP images will be saved.
+            run (StreamRun): The run the items belong to.
+            items (List[any]): The items to process.
+            task (Callable[[any], None]): Processes a single item.
+            cache_keys (Callable[[any], List[str]]): The cache keys of a single item.
+            on_done (Callable[[concurrent.futures.Future], None]): Called with every finished future.
 
         Returns:
             None
         """
 
-        args_list = []
-        for root, _, filenames in os.walk(rgb_path):
-            for img_file in filenames:
-                if img_file.endswith(".jpg"):
-                    img_path = os.path.join(root, img_file)
-                    pill_name = self.extract_pill_name(img_file)
-                    lbp_pill_dir = os.path.join(lbp_path, pill_name)
-                    os.makedirs(lbp_pill_dir, exist_ok=True)
-                    output_path = os.path.join(lbp_pill_dir, f"lbp_{img_file}")
+        def collect(futures):
+            for future in concurrent.futures.as_completed(futures):
+                if run.stopped:
+                    return
+                on_done(future)
+
+        previous_window = []
+        window = []
+        try:
+            for start in range(0, len(items), STREAM_WINDOW_SIZE):
+                if run.stopped:
+                    break
+                window_items = items[start:start + STREAM_WINDOW_SIZE]
+                self.prefetch_cache(run, [key for item in window_items for key in cache_keys(item)])
+                window = [self.executor.submit(task, item) for item in window_items]
+                collect(previous_window)
+                previous_window = window
+            collect(previous_window)
+        finally:
+            pending = previous_window + window
+            for future in pending:
+                future.cancel()
+            concurrent.futures.wait(pending)
+
+    def save_stream_images(self, paths: Dict[str, str], run: StreamRun) -> None:
+        """
+        Creates the RGB images and the contour, texture and LBP images derived from them, one task per
+        image, so each derived image is processed as soon as its RGB image is written instead of after the
+        whole batch. Images are processed in windows of STREAM_WINDOW_SIZE (see run_in_windows), and the
+        Redis cache is read per window and written back in batches instead of once per image.
+
+        Args:
+            paths (Dict[str, str]): The paths returned by path_selector for the current mode.
+            run (StreamRun): The run the images belong to.
 
-                    args_list.append((cv2.imread(img_path, 0), output_path))
+        Returns:
+            None
+        """
+
+        color_images, mask_images = self.load_files(
+            paths["wo_bg"], paths["masks"], ".jpg", ".jpg"
+        )
+        max_size = self.get_max_crop_size(color_images, mask_images)
 
-        self.total = len(args_list)
+        self.total = len(color_images) * 4
         self.processed = 0
-        self.progress = 0
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
-            futures = [executor.submit(self.process_lbp_image, args)
-                       for args in args_list]
-            concurrent.futures.wait(futures)
+        self.ensure_pill_directories(
+            [paths["rgb"], paths["contour"], paths["texture"], paths["lbp"]], color_images)
+
+        def process_pair(pair):
+            self.process_stream_image((pair, paths["rgb"], max_size), paths, run)
+
+        def pair_cache_keys(pair):
+            img_file = os.path.basename(pair[0])
+            return [
+                self.get_cache_key("rgb", img_file),
+                self.get_cache_key("contour", img_file),
+                self.get_cache_key("texture", img_file),
+                self.get_lbp_cache_key(f"lbp_{img_file}")
+            ]
+
+        try:
+            with tqdm(total=len(color_images), desc="Stream images") as progress:
+                def on_done(future):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(f"Error processing RGB image: {str(e)}")
+                    progress.update()
+
+                self.run_in_windows(run, list(zip(color_images, mask_images)),
+                                    process_pair, pair_cache_keys, on_done)
+        finally:
+            self.flush_cache(run)
+            self.flush_writes(run)
 
     def clear_cache(self, mode: str = None):
         """
@@ -908,12 +1814,21 @@ class StreamImage():
 
         try:
             if mode:
-                keys = self.redis.keys(f"{self.cache_prefix}{mode}:*")
+                pattern = f"{self.cache_prefix}{mode}:*"
             else:
-                keys = self.redis.keys(f"{self.cache_prefix}*")
+                pattern = f"{self.cache_prefix}*"
+
+            # SCAN walks the keyspace incrementally instead of blocking Redis like KEYS, and UNLINK frees
+            # the values in the background. Deleting keys while scanning is safe for SCAN.
+            keys = []
+            for key in self.redis.scan_iter(match=pattern, count=CACHE_BATCH_SIZE):
+                keys.append(key)
+                if len(keys) >= CACHE_BATCH_SIZE:
+                    self.redis.unlink(*keys)
+                    keys = []
 
             if keys:
-                self.redis.delete(*keys)
+                self.redis.unlink(*keys)
             logger.info(
                 f"Cleared Redis cache for {mode if mode else 'all operations'}")
         except Exception as e:
@@ -943,9 +1858,10 @@ class StreamImage():
         if self.selected_mode not in ["consumer", "reference"]:
             return {"status": "error", "message": "Invalid mode selected"}
 
+        run = StreamRun()
         try:
+            self.stream_run = run
             self.is_processing = True
-            self.progress = 0
             self.processed = 0
             self.total = 0
 
@@ -958,10 +1874,10 @@ class StreamImage():
 
             self.clear_output()
 
-            self.save_rgb_images(paths["wo_bg"], paths["masks"], paths["rgb"])
-            self.save_contour_images(paths["rgb"], paths["contour"])
-            self.save_texture_images(paths["rgb"], paths["texture"])
-            self.save_lbp_images(paths["rgb"], paths["lbp"])
+            self.save_stream_images(paths, run)
+
+            if run.stopped:
+                return {"status": "stopped", "message": "Stream image creation stopped by user request"}
 
             return {
                 "status": "success",
@@ -979,6 +1895,7 @@ class StreamImage():
             )
         finally:
             self.is_processing = False
+            run.finished.set()
 
     async def get_progress(self):
         """
@@ -991,14 +1908,16 @@ class StreamImage():
             dict: A dictionary with progress information.
         """
 
+        progress = int((self.processed / self.total) * 100) if self.total else 0
+
         logger.info({
-            "progress": self.progress,
+            "progress": progress,
             "processed": self.processed,
             "total": self.total,
             "is_processing": self.is_processing
         })
         return {
-            "progress": self.progress,
+            "progress": progress,
             "processed": self.processed,
             "total": self.total,
             "is_processing": self.is_processing
@@ -1020,17 +1939,26 @@ class StreamImage():
 
             self.clear_cache(self.selected_mode)
 
+            # Each output directory is swapped for an empty one and the old tree is deleted on the worker
+            # pool, so clearing does not wait for one unlink per image. The old trees are moved out of the
+            # output tree, and whatever is left of them after a crash is deleted by sweep_trash.
+            os.makedirs(AppConfig.STREAM_IMAGES_TRASH, exist_ok=True)
             for output_type in ["rgb", "contour", "texture", "lbp"]:
-                if os.path.exists(paths[output_type]):
-                    for root, dirs, files in os.walk(paths[output_type]):
-                        for file in files:
-                            file_path = os.path.join(root, file)
-                            try:
-                                if os.path.isfile(file_path):
-                                    os.unlink(file_path)
-                            except Exception as e:
-                                logger.error(
-                                    f"Failed to delete {file_path}: {str(e)}")
+                output_dir = paths[output_type]
+                if not os.path.isdir(output_dir):
+                    continue
+
+                trash_dir = tempfile.mkdtemp(
+                    prefix=f"{self.selected_mode}_", dir=AppConfig.STREAM_IMAGES_TRASH)
+                try:
+                    os.rename(output_dir, os.path.join(trash_dir, output_type))
+                except OSError:
+                    # The trash directory is on another filesystem, so the tree is deleted in place.
+                    os.rmdir(trash_dir)
+                    shutil.rmtree(output_dir)
+                else:
+                    self.executor.submit(shutil.rmtree, trash_dir, ignore_errors=True)
+                os.makedirs(output_dir, exist_ok=True)
 
             logger.info(
                 f"Cleared output directories and cache for {self.selected_mode} mode")
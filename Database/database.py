@@ -1,3 +1,6 @@
+import asyncio
+import concurrent.futures
+import functools
 import sqlite3
 
 from typing import Optional
@@ -5,9 +8,32 @@ from typing import Optional
 from Models.roles import Role
 from Models.user import User
 
+USER_COLUMNS = "user_id, first_name, last_name, email, hashed_password, role"
+
+
+def run_on_db_thread(method):
+    # Turns a blocking query method into a coroutine that runs it on the database's own thread,
+    # so SQLite I/O never stalls the event loop and the connection is only ever used by one thread.
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(method, self, *args, **kwargs))
+    return wrapper
+
+
 class Database:
     def __init__(self, db_name: str = "medicinerecognition.db"):
-        self.conn = sqlite3.connect(db_name)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        # Set up here, then only used from the executor's single thread.
+        self.conn = sqlite3.connect(db_name, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # WAL only syncs at checkpoints instead of on every commit, and lets reads run alongside a write.
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        # 64 MB page cache and up to 256 MB of the file memory-mapped, so reads skip the read() copies.
+        self.conn.execute("PRAGMA cache_size=-64000")
+        self.conn.execute("PRAGMA mmap_size=268435456")
         self.create_tables()
         
     def create_tables(self):
@@ -32,15 +58,20 @@ class Database:
         )
         """)
         
-        for role in Role:
-            cursor.execute(
-                "INSERT OR IGNORE INTO roles (name) VALUES (?)",
-                (role.value,)
-            )
+        # email and roles.name are already indexed through their UNIQUE constraints.
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)"
+        )
+        
+        cursor.executemany(
+            "INSERT OR IGNORE INTO roles (name) VALUES (?)",
+            [(role.value,) for role in Role]
+        )
         
         self.conn.commit()
 
-    async def add_user(self, user_data: dict) -> int:
+    @run_on_db_thread
+    def add_user(self, user_data: dict) -> int:
         cursor = self.conn.cursor()
         cursor.execute(
             """
@@ -59,58 +90,64 @@ class Database:
         self.conn.commit()
         return cursor.lastrowid
 
-    async def get_user(self, user_id: int) -> Optional[User]:
+    @run_on_db_thread
+    def add_users(self, users_data: list[dict]) -> int:
+        # One executemany in a single transaction, so a bulk import commits (and syncs) once.
+        with self.conn:
+            cursor = self.conn.executemany(
+                """
+                INSERT INTO users 
+                (first_name, last_name, email, hashed_password, role)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        user_data["first_name"],
+                        user_data["last_name"],
+                        user_data["email"],
+                        user_data["hashed_password"],
+                        user_data["role"]
+                    ) for user_data in users_data
+                ]
+            )
+        return cursor.rowcount
+
+    @run_on_db_thread
+    def get_user(self, user_id: int) -> Optional[User]:
         cursor = self.conn.cursor()
         cursor.execute(
-            "SELECT * FROM users WHERE user_id = ?",
+            f"SELECT {USER_COLUMNS} FROM users WHERE user_id = ?",
             (user_id,)
         )
         row = cursor.fetchone()
         if row:
-            return User(
-                user_id=row[0],
-                first_name=row[1],
-                last_name=row[2],
-                email=row[3],
-                hashed_password=row[4],
-                role=Role(row[5])
-            )
+            return User(**dict(row))
         return None
     
-    async def get_user_by_email(self, email: str) -> Optional[User]:
+    @run_on_db_thread
+    def get_user_by_email(self, email: str) -> Optional[User]:
         cursor = self.conn.cursor()
         cursor.execute(
-            "SELECT * FROM users WHERE email = ?",
+            f"SELECT {USER_COLUMNS} FROM users WHERE email = ?",
             (email,)
         )
         row = cursor.fetchone()
         if row:
-            return User(
-                user_id=row[0],
-                first_name=row[1],
-                last_name=row[2],
-                email=row[3],
-                hashed_password=row[4],
-                role=Role(row[5])
-            )
+            return User(**dict(row))
         return None
     
-    async def get_all_users(self) -> list[User]:
+    @run_on_db_thread
+    def get_all_users(self, offset: int = 0, limit: Optional[int] = None) -> list[User]:
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM users")
-        rows = cursor.fetchall()
-        return [
-            User(
-                user_id=row[0],
-                first_name=row[1],
-                last_name=row[2],
-                email=row[3],
-                hashed_password=row[4],
-                role=Role(row[5])
-            ) for row in rows
-        ]
+        # A negative LIMIT means no limit in SQLite.
+        cursor.execute(
+            f"SELECT {USER_COLUMNS} FROM users ORDER BY user_id LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset)
+        )
+        return [User(**dict(row)) for row in cursor]
         
-    async def update_user(self, user_data: dict) -> int:
+    @run_on_db_thread
+    def update_user(self, user_data: dict) -> int:
         cursor = self.conn.cursor()
         cursor.execute(
             """
@@ -129,7 +166,8 @@ class Database:
         self.conn.commit()
         return user_data["user_id"]
     
-    async def delete_user(self, user_id: int):
+    @run_on_db_thread
+    def delete_user(self, user_id: int):
         cursor = self.conn.cursor()
         cursor.execute(
             "DELETE FROM users WHERE user_id = ?",
@@ -138,4 +176,5 @@ class Database:
         self.conn.commit()
 
     def close(self):
+        self.executor.shutdown(wait=True)
         self.conn.close()
\ No newline at end of file
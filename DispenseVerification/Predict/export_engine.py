@@ -0,0 +1,31 @@
+import os
+from ultralytics import YOLO
+
+from Config.config import AppConfig
+
+
+def main() -> None:
+    """
+    One-time build of the TensorRT FP16 engine DispenseVerification loads instead of the PyTorch weights.
+    Run from the repository root with `python -m DispenseVerification.Predict.export_engine` on the GPU
+    the server uses, since the engine is tuned to it. The dynamic batch profile covers up to
+    SEGMENTATION_BATCH_SIZE images.
+
+    Args:
+        None
+
+    Returns:
+        None
+    """
+    model = YOLO(AppConfig.SEGMENTATION_WEIGHTS, task='segment')
+    engine_path = model.export(format="engine", imgsz=640, device=0, half=True,
+                               dynamic=True, batch=AppConfig.SEGMENTATION_BATCH_SIZE)
+
+    if os.path.abspath(engine_path) != os.path.abspath(AppConfig.SEGMENTATION_ENGINE):
+        os.replace(engine_path, AppConfig.SEGMENTATION_ENGINE)
+
+    print(f"TensorRT engine saved to {AppConfig.SEGMENTATION_ENGINE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,76 @@
+import argparse
 import os
 import cv2
-import numpy as np
 from ultralytics import YOLO
 
-model_path = "/home/thehunsaiyan/Desktop/PE_MedicineRecognision/Data/SegmentationWeights/best.pt"
-model = YOLO(model_path, task='segment')
+from Config.config import AppConfig
 
-source = "/home/thehunsaiyan/Desktop/PE_MedicineRecognision/Data/Dataset/apranax_550_mg/images/train"
 
-output_dir = "/home/thehunsaiyan/Desktop/qwsdg"
-os.makedirs(output_dir, exist_ok=True)
+def parse_args() -> argparse.Namespace:
+    """
+    Parse the command line arguments of the pill extraction script.
 
-image_files = [os.path.join(source, f) for f in os.listdir(source)
-               if f.lower().endswith('.jpg')]
-image_files = image_files[:10]
+    Args:
+        None
 
-print(f"Processing {len(image_files)} images")
+    Returns:
+        argparse.Namespace: The weights, source and output paths and the image limit.
+    """
+    parser = argparse.ArgumentParser(
+        description="Extract segmented pills from images onto a gray background. Run from the repository "
+                    "root with `python -m DispenseVerification.Predict.predict`.")
+    parser.add_argument(
+        "--model", default=AppConfig.SEGMENTATION_WEIGHTS,
+        help="Segmentation weights; a .engine file next to them is used instead when present.")
+    parser.add_argument(
+        "--source", required=True,
+        help="Directory of .jpg images to process.")
+    parser.add_argument(
+        "--output", required=True,
+        help="Directory the extracted pills are written to.")
+    parser.add_argument(
+        "--limit", type=int, default=10,
+        help="Maximum number of images to process.")
+    return parser.parse_args()
 
-for i, image_path in enumerate(image_files):
-    print(
-        f"Processing image {i+1}/{len(image_files)}: {os.path.basename(image_path)}")
 
-    try:
-        results = model(image_path)
+def main() -> None:
+    """
+    Run the segmentation model over the source images and save every detected
+    pill, cropped to its box and placed on a gray background.
 
-        for r in results:
+    Args:
+        None
+
+    Returns:
+        None
+    """
+    args = parse_args()
+
+    model_path = args.model
+    engine_path = os.path.splitext(model_path)[0] + ".engine"
+    model = YOLO(engine_path if os.path.isfile(engine_path) else model_path, task='segment')
+
+    source = args.source
+
+    output_dir = args.output
+    os.makedirs(output_dir, exist_ok=True)
+
+    image_files = [os.path.join(source, f) for f in os.listdir(source)
+                   if f.lower().endswith('.jpg')]
+    image_files = image_files[:args.limit]
+
+    print(f"Processing {len(image_files)} images")
+
+    # All images go through the model in batches instead of one call per image; stream=True yields the
+    # results one by one, so only a batch of them is held in memory at a time.
+    results = model(image_files, batch=AppConfig.SEGMENTATION_BATCH_SIZE, stream=True, verbose=False)
+
+    for i, (image_path, r) in enumerate(zip(image_files, results)):
+        print(
+            f"Processing image {i+1}/{len(image_files)}: {os.path.basename(image_path)}")
+
+        try:
             img = r.orig_img
 
             if r.masks is not None:
@@ -35,13 +81,6 @@ for i, image_path in enumerate(image_files):
                     mask = mask.cpu().numpy()
                     mask = cv2.resize(mask, (img.shape[1], img.shape[0]))
 
-                    binary_mask = (mask > 0.5).astype(np.uint8) * 255
-
-                    background = np.full_like(img, (145, 145, 145))
-
-                    extracted_pill = np.where(
-                        binary_mask[..., None] == 255, img, background)
-
                     x1, y1, x2, y2 = map(int, box.xyxy[0].cpu().numpy())
 
                     padding = 10
@@ -50,7 +89,9 @@ for i, image_path in enumerate(image_files):
                     x2 = min(img.shape[1], x2 + padding)
                     y2 = min(img.shape[0], y2 + padding)
 
-                    cropped_pill = extracted_pill[y1:y2, x1:x2]
+                    # Only the padded box is saved, so the background fill is done on that crop alone.
+                    cropped_pill = img[y1:y2, x1:x2].copy()
+                    cropped_pill[~(mask[y1:y2, x1:x2] > 0.5)] = (145, 145, 145)
 
                     output_path = os.path.join(
                         output_dir, f"image_{i}_pill_{j}.jpg")
@@ -60,8 +101,12 @@ for i, image_path in enumerate(image_files):
             else:
                 print(f"No masks found in image {i}")
 
-    except Exception as e:
-        print(f"Error processing {image_path}: {str(e)}")
-        continue
+        except Exception as e:
+            print(f"Error processing {image_path}: {str(e)}")
+            continue
+
+    print("Extraction complete!")
+
 
-print("Extraction complete!")
+if __name__ == "__main__":
+    main()
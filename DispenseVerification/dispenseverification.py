@@ -1,15 +1,19 @@
+import asyncio
+import bisect
+import concurrent.futures
 import cv2
-import glob
 import numpy as np
 import os
 from pathlib import Path
 import random
-import tempfile
+import torch
 from typing import Any, Dict, List, Optional
+import uuid
 
 from fastapi import File, Form, HTTPException, UploadFile, status
 from pathlib import Path
 from ultralytics import YOLO
+from ultralytics.utils import ops
 
 from Config.config import AppConfig
 from Controllers.camera_controller import CameraController
@@ -39,9 +43,29 @@ class DispenseVerification:
         self.verification_manager = VerificationManager(camera, led)
         self.initialized = False
         self.recipe: Recipe = None
-        self.yolo_model = YOLO(str(Path(AppConfig.SEGMENTATION_WEIGHTS)))
+        self.background_paths: List[Path] = []
+        self.verif_image_names: List[str] = []
+        self.verif_images_mtime: Optional[int] = None
+        # Writes the optional pill crops and overlays so the response doesn't wait on encoding.
+        self.artifact_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        # The TensorRT FP16 engine built by Predict/export_engine.py is used when present.
+        weights = AppConfig.SEGMENTATION_ENGINE if os.path.isfile(
+            AppConfig.SEGMENTATION_ENGINE) else AppConfig.SEGMENTATION_WEIGHTS
+        self.yolo_model = YOLO(str(Path(weights)), task="segment")
         logger.info(self.yolo_model.names)
 
+    def shutdown(self) -> None:
+        """
+        Shuts down the artifact writer pool, waiting for the queued crops and overlays to be written.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.artifact_executor.shutdown(wait=True)
+
     async def initialization(self):
         """
         Initialize the verification system components.
@@ -122,9 +146,36 @@ class DispenseVerification:
                 detail=f"Invalid recipe data: {str(e)}"
             )
 
+    def get_verif_image_names(self) -> List[str]:
+        """
+        Return the names of the jpg images directly inside VERIF_IMAGES. The listing is kept in memory
+        and only rescanned when the directory's modification time changes, i.e. when images are added,
+        removed or renamed.
+
+        Args:
+            None
+
+        Returns:
+            List[str]: The image file names, excluding hidden files like glob does.
+        """
+        try:
+            mtime = os.stat(AppConfig.VERIF_IMAGES).st_mtime_ns
+        except FileNotFoundError:
+            self.verif_image_names, self.verif_images_mtime = [], None
+            return []
+
+        if mtime != self.verif_images_mtime:
+            with os.scandir(AppConfig.VERIF_IMAGES) as entries:
+                self.verif_image_names = [entry.name for entry in entries
+                                          if entry.name.endswith(".jpg") and not entry.name.startswith(".")]
+            self.verif_images_mtime = mtime
+
+        return self.verif_image_names
+
     async def find_pill_images(self, pill_name: str) -> List[str]:
         """
-        Find all reference images for a given pill name in the VERIF_IMAGES directory.
+        Find all reference images for a given pill name in the VERIF_IMAGES directory, i.e. the images
+        whose name contains the cleaned pill name, from the cached directory listing.
 
         Args:
             pill_name (str): The name of the pill to find images for
@@ -137,40 +188,17 @@ class DispenseVerification:
 
             logger.info(f"Searching for images matching: {clean_pill_name}")
 
-            exact_patterns = [
-                f"{clean_pill_name}.jpg"
-            ]
-
-            partial_patterns = [
-                f"*{clean_pill_name}*.jpg"
-            ]
-
-            found_images = []
-
-            for pattern in exact_patterns:
-                search_path = str(Path(AppConfig.VERIF_IMAGES) / pattern)
-                images = glob.glob(search_path)
-                if images:
-                    logger.info(f"Exact match found for {pattern}: {images}")
-                found_images.extend(images)
-
-            for pattern in partial_patterns:
-                search_path = str(Path(AppConfig.VERIF_IMAGES) / pattern)
-                images = glob.glob(search_path)
-                if images:
-                    logger.info(f"Partial match found for {pattern}: {images}")
-                found_images.extend(images)
-
-            unique_images = list(set(found_images))
-
-            relative_images = []
-            for img_path in unique_images:
-                try:
-                    relative_path = Path(img_path).relative_to(
-                        AppConfig.VERIF_IMAGES).as_posix()
-                    relative_images.append(relative_path)
-                except ValueError:
-                    continue
+            exact_name = f"{clean_pill_name}.jpg"
+
+            # Same matches as globbing "{name}.jpg" and "*{name}*.jpg"; the exact match is one of the partial ones.
+            relative_images = [name for name in self.get_verif_image_names()
+                               if clean_pill_name in name[:-len(".jpg")]]
+
+            if exact_name in relative_images:
+                logger.info(f"Exact match found for {exact_name}")
+            if relative_images:
+                logger.info(
+                    f"Partial match found for *{clean_pill_name}*.jpg: {relative_images}")
 
             logger.info(
                 f"Final images found for {pill_name}: {relative_images}")
@@ -202,11 +230,20 @@ class DispenseVerification:
         else:
             return {"error": "No recipe selected and no recipe data provided"}
 
+        # Each distinct pill is looked up once, even if it is dispensed into several bays, and the
+        # lookups are scheduled together instead of awaited one after another.
+        pill_names = list(dict.fromkeys(
+            medication.pill_name
+            for medications in recipe_to_use.medications.values()
+            for medication in medications))
+        found_images = dict(zip(pill_names, await asyncio.gather(
+            *(self.find_pill_images(pill_name) for pill_name in pill_names))))
+
         result = {}
         for bay_name, medications in recipe_to_use.medications.items():
             result[bay_name] = []
             for medication in medications:
-                image_paths = await self.find_pill_images(medication.pill_name)
+                image_paths = found_images[medication.pill_name]
 
                 logger.info(
                     f"Searching for {medication.pill_name}: found {len(image_paths)} images")
@@ -224,6 +261,8 @@ class DispenseVerification:
     def get_random_background(self, background_root: Path, target_size):
         """
         Pick a random jpg background from nested dirs and resize to target_size.
+        The background list is scanned once and reused; an empty scan is not cached, so backgrounds
+        added later are still found.
 
         Args:
             background_root: The folder where the backgrounds are located,
@@ -232,15 +271,17 @@ class DispenseVerification:
         Returns:
             A resized background
         """
-        all_backgrounds = list(background_root.rglob("*.jpg"))
-        if not all_backgrounds:
+        if not self.background_paths:
+            self.background_paths = list(background_root.rglob("*.jpg"))
+        if not self.background_paths:
             raise FileNotFoundError(
                 "No backgrounds found in BACKGROUND_IMAGES")
 
-        bg_path = random.choice(all_backgrounds)
+        bg_path = random.choice(self.background_paths)
         bg = cv2.imread(str(bg_path))
 
         if bg is None:
+            self.background_paths = []
             raise ValueError(f"Failed to read background {bg_path}")
 
         return cv2.resize(bg, (target_size[0], target_size[1])), bg_path
@@ -278,83 +319,90 @@ class DispenseVerification:
                 "dispensing_bay_4": []
             }
 
-            bay_boundaries = [
-                (0, img_w * 0.35),
-                (img_w * 0.35, img_w * 0.50),
-                (img_w * 0.50, img_w * 0.65),
-                (img_w * 0.65, img_w)
-            ]
+            # Inner bay edges: a pill belongs to the bay whose half-open [start, end) range holds its
+            # center, and everything right of the last edge to the last bay.
+            bay_edges = [img_w * 0.35, img_w * 0.50, img_w * 0.65]
             bay_names = ["dispensing_bay_1", "dispensing_bay_2",
                          "dispensing_bay_3", "dispensing_bay_4"]
 
-            for r in results:
-                if r.masks is None or r.masks.xy is None:
-                    continue
-
-                for mask_xy, cls_id in zip(r.masks.xy, r.boxes.cls):
-                    polygon = mask_xy.astype(np.int32)
-
-                    mask = np.zeros((img_h, img_w), dtype=np.uint8)
-                    cv2.fillPoly(mask, [polygon], 255)
-
-                    x, y, w, h = cv2.boundingRect(polygon)
+            save_artifacts = AppConfig.SAVE_VERIFICATION_ARTIFACTS
+            if save_artifacts:
+                pills_dir = Path(AppConfig.VERIF_PILLS)
+                pills_dir.mkdir(parents=True, exist_ok=True)
+                backgrounds_dir = Path(AppConfig.VERIF_BACKGROUNDS)
+                backgrounds_dir.mkdir(parents=True, exist_ok=True)
 
-                    txt_content = f"{int(cls_id)} " + \
-                        " ".join([f"{x} {y}" for (x, y) in polygon]) + "\n"
+            # One background per request, read and resized on the first detection and shared by all of them.
+            background = None
 
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".txt") as tmp_txt:
-                        tmp_txt.write(txt_content.encode("utf-8"))
-                        txt_path = tmp_txt.name
+            # One full-frame mask buffer per request; each mask lies inside its bounding box, so clearing
+            # the previous box is enough to start the next mask from zero.
+            mask = np.zeros((img_h, img_w), dtype=np.uint8)
+            previous_rect = None
 
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp_img:
-                        cv2.imwrite(tmp_img.name, frame)
-                        img_path = tmp_img.name
+            for r in results:
+                if r.masks is None:
+                    continue
 
+                # All instance masks are scaled to the frame (undoing the letterbox) in one batched op on the
+                # model's device, and their boxes are found there, so only the box crops are copied back.
+                instance_masks = ops.scale_masks(
+                    r.masks.data[None].float(), (img_h, img_w))[0] > 0.5
+                rows = instance_masks.any(dim=2).int()
+                cols = instance_masks.any(dim=1).int()
+                boxes = torch.stack([
+                    cols.argmax(dim=1),
+                    rows.argmax(dim=1),
+                    img_w - cols.flip(1).argmax(dim=1),
+                    img_h - rows.flip(1).argmax(dim=1),
+                    rows.amax(dim=1)
+                ], dim=1).tolist()
+
+                for instance_mask, (x0, y0, x1, y1, present), cls_id in zip(
+                        instance_masks, boxes, r.boxes.cls.tolist()):
+                    if previous_rect is not None:
+                        px, py, pw, ph = previous_rect
+                        mask[py:py+ph, px:px+pw] = 0
+
+                    x, y, w, h = (x0, y0, x1 - x0, y1 - y0) if present else (0, 0, 0, 0)
+                    mask[y:y+h, x:x+w] = instance_mask[y:y+h, x:x+w].to(
+                        torch.uint8).mul_(255).cpu().numpy()
+                    previous_rect = (x, y, w, h)
+
+                    # save_masks only takes the file name from the image path, so a unique name is all it needs.
                     CreateMask.save_masks(
-                        mask, img_path, AppConfig.VERIF_MASKS)
+                        mask, f"{uuid.uuid4().hex}.jpg", AppConfig.VERIF_MASKS)
                     if w == 0 or h == 0:
                         continue
-                    x, y = max(0, x), max(0, y)
-                    w, h = min(w, img_w - x), min(h, img_h - y)
 
                     center_x = x + w // 2
-                    bay = next((bay_names[i] for i, (start, end) in enumerate(bay_boundaries)
-                                if start <= center_x < end), bay_names[-1])
+                    bay = bay_names[bisect.bisect_right(bay_edges, center_x)]
 
                     pill_name = self.yolo_model.names[int(cls_id)]
 
-                    pill_rgba = cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
-                    mask_resized = mask
-                    pill_rgba[:, :, 3] = mask_resized
-                    pill_crop = pill_rgba[y:y+h, x:x+w]
-
-                    if pill_crop.size == 0:
-                        continue
-
-                    output_dir = Path(AppConfig.VERIF_PILLS)
-                    output_dir.mkdir(parents=True, exist_ok=True)
-                    filename = f"{pill_name}_{bay}_{x}_{y}.png"
-                    save_path = output_dir / filename
-                    cv2.imwrite(str(save_path), pill_crop)
-
-                    bg_root = Path(AppConfig.BACKGROUND_IMAGES)
-                    background, _ = self.get_random_background(
-                        bg_root, (img_w, img_h))
-                    bg_rgba = cv2.cvtColor(background, cv2.COLOR_BGR2BGRA)
-
-                    mask_inv = cv2.bitwise_not(mask_resized)
-                    mask_inv_rgb = cv2.cvtColor(mask_inv, cv2.COLOR_GRAY2BGR)
-
-                    pill_only = cv2.bitwise_and(frame, frame, mask=mask)
-                    bg_only = cv2.bitwise_and(background, mask_inv_rgb)
-
-                    overlay = cv2.add(pill_only, bg_only)
-
-                    output_dir = Path(AppConfig.VERIF_BACKGROUNDS)
-                    output_dir.mkdir(parents=True, exist_ok=True)
-                    filename = f"{pill_name}_{bay}_{x}_{y}_bg.jpg"
-                    save_path = output_dir / filename
-                    cv2.imwrite(str(save_path), overlay)
+                    # The mask lies inside its bounding box, so the crop and the composite below only
+                    # need to touch that region instead of the whole frame.
+                    frame_roi = frame[y:y+h, x:x+w]
+                    mask_roi = mask[y:y+h, x:x+w]
+
+                    # The crop and overlay are only kept for debugging and audits.
+                    if save_artifacts:
+                        pill_crop = np.dstack([frame_roi, mask_roi])
+                        filename = f"{pill_name}_{bay}_{x}_{y}.png"
+                        self.artifact_executor.submit(
+                            cv2.imwrite, str(pills_dir / filename), pill_crop)
+
+                        if background is None:
+                            background, _ = self.get_random_background(
+                                Path(AppConfig.BACKGROUND_IMAGES), (img_w, img_h))
+
+                        overlay = background.copy()
+                        np.copyto(overlay[y:y+h, x:x+w], frame_roi,
+                                  where=(mask_roi > 0)[:, :, None])
+
+                        filename = f"{pill_name}_{bay}_{x}_{y}_bg.jpg"
+                        self.artifact_executor.submit(
+                            cv2.imwrite, str(backgrounds_dir / filename), overlay)
 
                     detected_medications[bay].append(Medication(
                         pill_name=pill_name,
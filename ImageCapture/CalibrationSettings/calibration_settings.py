@@ -1,3 +1,5 @@
+import asyncio
+import concurrent.futures
 import cv2
 import numpy as np
 import os
@@ -6,6 +8,7 @@ from datetime import datetime
 from fastapi import HTTPException, status
 from fastapi.responses import FileResponse
 from io import BytesIO
+from typing import Optional, Tuple
 
 from Config.config import AppConfig
 from Logger.logger import logger
@@ -72,6 +75,62 @@ class CalibrationSettings:
                 detail=f"Failed to save calibration parameters: {str(e)}"
             )
 
+    def _process_calibration_image(self, filename: str, data: bytes) -> Optional[Tuple[np.ndarray, np.ndarray, str]]:
+        """
+        Save one uploaded calibration image and find the refined chessboard corners in it.
+        The saved file is removed again if it can't be read or has no chessboard.
+
+        Args:
+            filename (str): Name of the uploaded file.
+            data (bytes): Content of the uploaded file.
+
+        Returns:
+            Optional[Tuple[np.ndarray, np.ndarray, str]]: The corners, the image and its saved path,
+            or None if the image is not usable for calibration.
+        """
+        file_path = None
+        try:
+            filename = os.path.basename(filename)
+            file_path = os.path.join(
+                AppConfig.CALIBRATION_IMAGES_DIR, filename)
+
+            with open(file_path, "wb") as buffer:
+                buffer.write(data)
+
+            src = cv2.imread(file_path)
+            if src is None:
+                os.remove(file_path)
+                return None
+
+            grey = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY)
+            ret, corners = cv2.findChessboardCorners(
+                grey,
+                (self.calibration_manager.calibration_params.chess_col,
+                 self.calibration_manager.calibration_params.chess_row),
+                None,
+                cv2.CALIB_CB_FAST_CHECK
+            )
+
+            if not ret:
+                logger.warning(f"Chessboard not found in {filename}")
+                os.remove(file_path)
+                return None
+
+            corners = cv2.cornerSubPix(
+                grey,
+                corners,
+                (11, 11),
+                (-1, -1),
+                criteria=(cv2.TERM_CRITERIA_EPS +
+                          cv2.TERM_CRITERIA_COUNT, 30, 0.001)
+            )
+            return corners, src, file_path
+        except Exception as e:
+            logger.warning(f"Error processing {filename}: {str(e)}")
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+            return None
+
     async def upload_calibration_images(self, files):
         """
         Upload calibration images for camera calibration.
@@ -90,56 +149,39 @@ class CalibrationSettings:
                     detail="Calibration parameters not configured"
                 )
 
-            image_points = []
-            object_points = []
-            good_files = 0
-            saved_images = []
-            original_images = []
+            loop = asyncio.get_running_loop()
 
-            for file in files:
+            # The uploads are read on the event loop and each one is saved and searched for the chessboard
+            # on a worker thread; OpenCV releases the GIL, so the images are processed in parallel.
+            async def process_upload(file, pool):
                 try:
-                    filename = os.path.basename(file.filename)
-                    file_path = os.path.join(
-                        AppConfig.CALIBRATION_IMAGES_DIR, filename)
-
-                    with open(file_path, "wb") as buffer:
-                        buffer.write(await file.read())
-
-                    src = cv2.imread(file_path)
-                    if src is None:
-                        os.remove(file_path)
-                        continue
-
-                    grey = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY)
-                    ret, corners = cv2.findChessboardCorners(
-                        grey,
-                        (self.calibration_manager.calibration_params.chess_col,
-                         self.calibration_manager.calibration_params.chess_row),
-                        None,
-                        cv2.CALIB_CB_FAST_CHECK
-                    )
-
-                    if ret:
-                        corners = cv2.cornerSubPix(
-                            grey,
-                            corners,
-                            (11, 11),
-                            (-1, -1),
-                            criteria=(cv2.TERM_CRITERIA_EPS +
-                                      cv2.TERM_CRITERIA_COUNT, 30, 0.001)
-                        )
-                        image_points.append(corners)
-                        original_images.append(src)
-                        saved_images.append(file_path)
-                        good_files += 1
-                    else:
-                        logger.warning(f"Chessboard not found in {filename}")
-                        os.remove(file_path)
+                    data = await file.read()
                 except Exception as e:
-                    logger.warning(f"Error processing {filename}: {str(e)}")
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
+                    logger.warning(f"Error reading {file.filename}: {str(e)}")
+                    return None
+                return await loop.run_in_executor(
+                    pool, self._process_calibration_image, file.filename, data)
+
+            # Uploads sharing a file name would be saved to the same path from different threads, so only
+            # the first of them is used.
+            unique_files = {}
+            for file in files:
+                filename = os.path.basename(file.filename)
+                if filename in unique_files:
+                    logger.warning(f"Skipping duplicate calibration image {filename}")
                     continue
+                unique_files[filename] = file
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+                processed = await asyncio.gather(
+                    *(process_upload(file, pool) for file in unique_files.values()),
+                    return_exceptions=False)
+
+            detections = [result for result in processed if result is not None]
+            image_points = [corners for corners, _, _ in detections]
+            original_images = [src for _, src, _ in detections]
+            saved_images = [file_path for _, _, file_path in detections]
+            good_files = len(detections)
 
             if good_files == 0:
                 logger.error(
@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from fastapi import HTTPException, status, Response
 from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer
+from typing import Optional
 
 from Config.config import AppConfig
 from Logger.logger import logger
@@ -94,17 +95,18 @@ class UserManager():
         }
         return jwt.encode(payload, AppConfig.JWT_SECRET_KEY, algorithm=AppConfig.JWT_ALGORITHM)
 
-    async def get_all_users(self):
+    async def get_all_users(self, offset: int = 0, limit: Optional[int] = None):
         """
-        Retrieve all users from the database.
+        Retrieve the registered users from the database, optionally one page at a time.
 
         Args:
-            None
+            offset (int): Number of users to skip, ordered by user ID.
+            limit (Optional[int]): Maximum number of users to return, or None for all of them.
 
         Returns:
-            list: List of User objects representing all registered users.
+            list: List of User objects representing the registered users.
         """
-        users = await self.database.get_all_users()
+        users = await self.database.get_all_users(offset, limit)
         if not users:
             logger.warning("No users found in the database")
             raise HTTPException(
@@ -149,7 +149,9 @@ class APIServer:
         @self.app.on_event("shutdown")
         async def shutdown_event():
             """
-            Clean up resources on shutdown, such as stopping the camera.
+            Clean up resources on shutdown, such as stopping the camera,
+            the stream image worker pool, the dispense verification artifact
+            writers and the database connection.
 
             Args:
                 None
@@ -159,6 +161,9 @@ class APIServer:
             """
             self.camera.stop_capture()
             logger.info("Camera stopped")
+            self.stream_image.shutdown()
+            self.dispenseverification.shutdown()
+            self.database.close()
 
         @self.app.post("/attempt_login")
         async def attempt_login(data: Dict[str, Any], response: Response, request: Request):
@@ -819,17 +824,18 @@ class APIServer:
             return await self.dispenseverification.verify_dispense(image)
 
         @self.app.get("/get_all_users")
-        async def get_all_users():
+        async def get_all_users(offset: int = 0, limit: Optional[int] = None):
             """
-            Get all users from the database.
+            Get the users from the database, optionally one page at a time.
 
             Args:
-                None
+                offset (int): Number of users to skip, ordered by user ID.
+                limit (Optional[int]): Maximum number of users to return, or None for all of them.
 
             Returns:
-                List[User]: A list of User objects representing all users in the database.
+                List[User]: A list of User objects representing the requested users.
             """
-            return await self.user_manager.get_all_users()
+            return await self.user_manager.get_all_users(offset, limit)
 
         @self.app.post("/create_user")
         async def create_user(data: Dict[str, Any]):